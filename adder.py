@@ -27,18 +27,24 @@ o_add1 = Operator('add1',
 )
 
 # Problem
-prob1 = PlanningProblem('add3x',
-    # Instances
-    [i_0, i_1, i_2, i_3],
-    # Operators
-    [o_add1],
-    # Initial state
-    [Proposition('got', i_0)],
-    # Goal state
-    [Proposition('got', i_3)]
-)
+def problems():
+    # A fresh copy of each problem of this domain, unsolved
+    prob1 = PlanningProblem('add3x',
+        # Instances
+        [i_0, i_1, i_2, i_3],
+        # Operators
+        [o_add1],
+        # Initial state
+        [Proposition('got', i_0)],
+        # Goal state
+        [Proposition('got', i_3)]
+    )
+    return [prob1]
+
 
-prob1.solve()
-print
-prob1.dump()
-prob1.display()
+if __name__ == '__main__':
+    [prob1] = problems()
+    prob1.solve()
+    print
+    prob1.dump()
+    prob1.display()
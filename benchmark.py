@@ -0,0 +1,48 @@
+# Compare the goal and achiever orderings of PlanningProblem.solve on the
+# bundled domains, by search nodes, backtracks, forward-checking cutoffs
+# and time.
+#
+# Usage: python benchmark.py [domain.py ...]
+
+import contextlib
+import io
+import sys
+import time
+
+from graphplan import NOOP, PlanningProblem, problem_factory
+
+DOMAINS = ['adder.py', 'blocks.py', 'cake.py', 'fixit.py', 'fox.py',
+           'hanoi-3.py', 'hanoi-4.py', 'missionaries.py', 'rocket.py']
+
+def run(factory, index, goal_order, achiever_order):
+    # Solve a fresh copy of problem index of factory
+    problem = factory()[index]
+    start = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = problem.solve(goal_order=goal_order,
+                               achiever_order=achiever_order)
+    elapsed = time.time() - start
+    steps = None
+    if result is not None:
+        steps = sum(len([a for a in level if a.name != NOOP])
+                    for level in result)
+    return (problem.stats['nodes'], problem.stats['backtracks'],
+            problem.stats['cutoffs'], steps, elapsed)
+
+def main(paths):
+    print('%-16s %-12s %-11s %9s %10s %8s %6s %8s' %
+          ('domain', 'goals', 'achievers', 'nodes', 'backtracks', 'cutoffs',
+           'steps', 'time'))
+    for path in paths:
+        factory = problem_factory(path)
+        for (index, problem) in enumerate(factory()):
+            for goal_order in PlanningProblem.goal_orders:
+                for achiever_order in PlanningProblem.achiever_orders:
+                    (nodes, backtracks, cutoffs, steps, elapsed) = run(
+                        factory, index, goal_order, achiever_order)
+                    print('%-16s %-12s %-11s %9d %10d %8d %6s %7.2fs' %
+                          (problem.name, goal_order, achiever_order, nodes,
+                           backtracks, cutoffs, steps, elapsed))
+
+if __name__ == '__main__':
+    main(sys.argv[1:] or DOMAINS)
@@ -17,121 +17,120 @@ v_from = Variable('from', BLOCK)
 v_to = Variable('to', BLOCK)
 
 o_move = Operator('move',
-    # Parameters
-    [v_obj, v_from, v_to],
     # Preconditions
-    [Proposition.newish('equal', [v_obj, v_from], False),
-     Proposition.newish('equal', [v_obj, v_to], False),
-     Proposition.newish('equal', [v_from, v_to], False),
-     Proposition.newish('on', [v_obj, v_from]),
-     Proposition.newish('clear', [v_obj]),
-     Proposition.newish('clear', [v_to])],
+    [Proposition(NOT_EQUAL, v_obj, v_from),
+     Proposition(NOT_EQUAL, v_obj, v_to),
+     Proposition(NOT_EQUAL, v_from, v_to),
+     Proposition('on', v_obj, v_from),
+     Proposition('clear', v_obj),
+     Proposition('clear', v_to)],
     # Adds
-    [Proposition.newish('on', [v_obj, v_to]),
-     Proposition.newish('clear', [v_from])],
+    [Proposition('on', v_obj, v_to),
+     Proposition('clear', v_from)],
     # Deletes
-    [Proposition.newish('on', [v_obj, v_from]),
-     Proposition.newish('clear', [v_to])])
+    [Proposition('on', v_obj, v_from),
+     Proposition('clear', v_to)])
 
 o_move_to_table = Operator('move_to_table',
-    # Parameters
-    [v_obj, v_from],
     # Preconditions
-    [Proposition.newish('equal', [v_obj, v_from], False),
-     Proposition.newish('on', [v_obj, v_from]),
-     Proposition.newish('clear', [v_obj])],
+    [Proposition(NOT_EQUAL, v_obj, v_from),
+     Proposition('on', v_obj, v_from),
+     Proposition('clear', v_obj)],
     # Adds
-    [Proposition.newish('on_table', [v_obj]),
-     Proposition.newish('clear', [v_from])],
+    [Proposition('on_table', v_obj),
+     Proposition('clear', v_from)],
     # Deletes
-    [Proposition.newish('on', [v_obj, v_from])])
+    [Proposition('on', v_obj, v_from)])
 
 o_move_from_table = Operator('move_from_table',
-    # Parameters
-    [v_obj, v_to],
     # Preconditions
-    [Proposition.newish('equal', [v_obj, v_to], False),
-     Proposition.newish('on_table', [v_obj]),
-     Proposition.newish('clear', [v_obj]),
-     Proposition.newish('clear', [v_to])],
+    [Proposition(NOT_EQUAL, v_obj, v_to),
+     Proposition('on_table', v_obj),
+     Proposition('clear', v_obj),
+     Proposition('clear', v_to)],
     # Adds
-    [Proposition.newish('on', [v_obj, v_to])],
+    [Proposition('on', v_obj, v_to)],
     # Deletes
-    [Proposition.newish('on_table', [v_obj]),
-     Proposition.newish('clear', [v_to])])
+    [Proposition('on_table', v_obj),
+     Proposition('clear', v_to)])
 
-prob1 = PlanningProblem('blocks_problem',
-    # Instances
-    [i_A, i_B, i_C],
-    # Operators
-    [o_move, o_move_to_table, o_move_from_table],
-    # Initial state
-    [Proposition.newish('on', [i_B, i_A]),
-     Proposition.newish('on_table', [i_A]),
-     Proposition.newish('on_table', [i_C]),
-     Proposition.newish('clear', [i_B]),
-     Proposition.newish('clear', [i_C])],
-    # Goals
-    [Proposition.newish('on', [i_A, i_B]),
-     Proposition.newish('on', [i_B, i_C])])
+def problems():
+    # A fresh copy of each problem of this domain, unsolved
+    prob1 = PlanningProblem('blocks_problem',
+        # Instances
+        [i_A, i_B, i_C],
+        # Operators
+        [o_move, o_move_to_table, o_move_from_table],
+        # Initial state
+        [Proposition('on', i_B, i_A),
+         Proposition('on_table', i_A),
+         Proposition('on_table', i_C),
+         Proposition('clear', i_B),
+         Proposition('clear', i_C)],
+        # Goals
+        [Proposition('on', i_A, i_B),
+         Proposition('on', i_B, i_C)])
 
-prob2 = PlanningProblem('blocks_problem2',
-    # Instances
-    [i_A, i_B, i_C],
-    # Operators
-    [o_move, o_move_to_table, o_move_from_table],
-    # Initial state
-    [Proposition.newish('on', [i_A, i_B]),
-     Proposition.newish('on_table', [i_B]),
-     Proposition.newish('on_table', [i_C]),
-     Proposition.newish('clear', [i_A]),
-     Proposition.newish('clear', [i_C])],
-    # Goals
-    [Proposition.newish('on', [i_A, i_B]),
-     Proposition.newish('on', [i_B, i_C])])
+    prob2 = PlanningProblem('blocks_problem2',
+        # Instances
+        [i_A, i_B, i_C],
+        # Operators
+        [o_move, o_move_to_table, o_move_from_table],
+        # Initial state
+        [Proposition('on', i_A, i_B),
+         Proposition('on_table', i_B),
+         Proposition('on_table', i_C),
+         Proposition('clear', i_A),
+         Proposition('clear', i_C)],
+        # Goals
+        [Proposition('on', i_A, i_B),
+         Proposition('on', i_B, i_C)])
 
-prob3 = PlanningProblem('blocks_problem2',
-    # Instances
-    [i_A, i_B, i_C, i_D],
-    # Operators
-    [o_move, o_move_to_table, o_move_from_table],
-    # Initial state
-    [Proposition.newish('on', [i_A, i_C]),
-     Proposition.newish('on', [i_C, i_B]),
-     Proposition.newish('on', [i_B, i_D]),
-     Proposition.newish('on_table', [i_D]),
-     Proposition.newish('clear', [i_A])],
-    # Goals
-    [Proposition.newish('on', [i_A, i_B]),
-     Proposition.newish('on', [i_B, i_C]),
-     Proposition.newish('on', [i_C, i_D])])
+    prob3 = PlanningProblem('blocks_problem2',
+        # Instances
+        [i_A, i_B, i_C, i_D],
+        # Operators
+        [o_move, o_move_to_table, o_move_from_table],
+        # Initial state
+        [Proposition('on', i_A, i_C),
+         Proposition('on', i_C, i_B),
+         Proposition('on', i_B, i_D),
+         Proposition('on_table', i_D),
+         Proposition('clear', i_A)],
+        # Goals
+        [Proposition('on', i_A, i_B),
+         Proposition('on', i_B, i_C),
+         Proposition('on', i_C, i_D)])
 
-prob_unsolvable1 = PlanningProblem('blocks_problem',
-    # Instances
-    [i_A, i_B, i_C],
-    # Operators
-    [o_move, o_move_to_table, o_move_from_table],
-    # Initial state
-    [Proposition.newish('on_table', [i_A]),
-     Proposition.newish('on_table', [i_B]),
-     Proposition.newish('on_table', [i_C]),
-     Proposition.newish('clear', [i_A]),
-     Proposition.newish('clear', [i_B]),
-     Proposition.newish('clear', [i_C])],
-    # Goals
-    [Proposition.newish('on', [i_A, i_B]),
-     Proposition.newish('on', [i_B, i_C]),
-     Proposition.newish('on', [i_C, i_A])])
+    prob_unsolvable1 = PlanningProblem('blocks_problem',
+        # Instances
+        [i_A, i_B, i_C],
+        # Operators
+        [o_move, o_move_to_table, o_move_from_table],
+        # Initial state
+        [Proposition('on_table', i_A),
+         Proposition('on_table', i_B),
+         Proposition('on_table', i_C),
+         Proposition('clear', i_A),
+         Proposition('clear', i_B),
+         Proposition('clear', i_C)],
+        # Goals
+        [Proposition('on', i_A, i_B),
+         Proposition('on', i_B, i_C),
+         Proposition('on', i_C, i_A)])
+    return [prob1, prob2, prob3, prob_unsolvable1]
 
-problem = prob3
 
-result = problem.solve()
-# problem.dump
-if result is not None:
-  print("Extracted plan:")
-  for level in result:
-      for action in level:
-          if action.name != NOOP:
-              print(action)
-else:
-  print("No plan found.")
+if __name__ == '__main__':
+    problem = problems()[2]
+
+    result = problem.solve()
+    # problem.dump
+    if result is not None:
+      print("Extracted plan:")
+      for level in result:
+          for action in level:
+              if action.name != NOOP:
+                  print(action)
+    else:
+      print("No plan found.")
@@ -31,19 +31,25 @@ op_bake = Operator('baker',
     [~Proposition('Have', i_cake)]
 )
 
-prob1 = PlanningProblem('have_and_eat',
-    # Instances
-    [i_cake],
-    # Operators
-    [op_eat, op_bake],
-    # Initial state
-    [Proposition('Have', i_cake)],
-    # Goals
-    [Proposition('Have', i_cake),
-     Proposition('Eaten', i_cake)]
-)
-
-prob1.solve()
-prob1.dump()
-print
-prob1.display()
+def problems():
+    # A fresh copy of each problem of this domain, unsolved
+    prob1 = PlanningProblem('have_and_eat',
+        # Instances
+        [i_cake],
+        # Operators
+        [op_eat, op_bake],
+        # Initial state
+        [Proposition('Have', i_cake)],
+        # Goals
+        [Proposition('Have', i_cake),
+         Proposition('Eaten', i_cake)]
+    )
+    return [prob1]
+
+
+if __name__ == '__main__':
+    [prob1] = problems()
+    prob1.solve()
+    prob1.dump()
+    print
+    prob1.display()
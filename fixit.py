@@ -223,36 +223,42 @@ o_inflate = Operator(
     [Proposition('not_inflated', v_wheel)]
 )
 
-problem = PlanningProblem(
-    'fixit_problem',
-    # Instances
-    [i_wheel1, i_wheel2, i_hub, i_nuts, i_boot, i_jack, i_pump, i_wrench],
-    # Operators
-    [o_cuss, o_open, o_close, o_fetch_tool, o_fetch_wheel, o_put_away_tool,
-     o_put_away_wheel, o_loosen, o_tighten, o_jack_up, o_jack_down, o_undo,
-     o_do_up, o_remove_wheel, o_put_on_wheel, o_inflate],
-    # Initial state
-    [Proposition('not_open', i_boot),
-     Proposition('intact', i_wheel2),
-     Proposition('in', i_jack, i_boot),
-     Proposition('in', i_pump, i_boot),
-     Proposition('in', i_wheel2, i_boot),
-     Proposition('in', i_wrench, i_boot),
-     Proposition('on', i_wheel1, i_hub),
-     Proposition('on_ground', i_hub),
-     Proposition('tight', i_nuts, i_hub),
-     Proposition('not_inflated', i_wheel2),
-     Proposition('not_unfastened', i_hub)],
-    # Goals
-    [Proposition('not_open', i_boot),
-     Proposition('in', i_jack, i_boot),
-     Proposition('in', i_pump, i_boot),
-     Proposition('in', i_wheel1, i_boot),
-     Proposition('in', i_wrench, i_boot),
-     Proposition('tight', i_nuts, i_hub),
-     Proposition('inflated', i_wheel2),
-     Proposition('on', i_wheel2, i_hub)])
+def problems():
+    # A fresh copy of each problem of this domain, unsolved
+    problem = PlanningProblem(
+        'fixit_problem',
+        # Instances
+        [i_wheel1, i_wheel2, i_hub, i_nuts, i_boot, i_jack, i_pump, i_wrench],
+        # Operators
+        [o_cuss, o_open, o_close, o_fetch_tool, o_fetch_wheel, o_put_away_tool,
+         o_put_away_wheel, o_loosen, o_tighten, o_jack_up, o_jack_down, o_undo,
+         o_do_up, o_remove_wheel, o_put_on_wheel, o_inflate],
+        # Initial state
+        [Proposition('not_open', i_boot),
+         Proposition('intact', i_wheel2),
+         Proposition('in', i_jack, i_boot),
+         Proposition('in', i_pump, i_boot),
+         Proposition('in', i_wheel2, i_boot),
+         Proposition('in', i_wrench, i_boot),
+         Proposition('on', i_wheel1, i_hub),
+         Proposition('on_ground', i_hub),
+         Proposition('tight', i_nuts, i_hub),
+         Proposition('not_inflated', i_wheel2),
+         Proposition('not_unfastened', i_hub)],
+        # Goals
+        [Proposition('not_open', i_boot),
+         Proposition('in', i_jack, i_boot),
+         Proposition('in', i_pump, i_boot),
+         Proposition('in', i_wheel1, i_boot),
+         Proposition('in', i_wrench, i_boot),
+         Proposition('tight', i_nuts, i_hub),
+         Proposition('inflated', i_wheel2),
+         Proposition('on', i_wheel2, i_hub)])
+    return [problem]
 
-problem.solve()
-problem.display()
-#problem.dump()
+
+if __name__ == '__main__':
+    [problem] = problems()
+    problem.solve()
+    problem.display()
+    #problem.dump()
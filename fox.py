@@ -87,27 +87,33 @@ o_move3 = Operator('move3',
 )
 
 
-problem = PlanningProblem('fox',
-    # Instances
-    [i_farmer, i_fox, i_goose, i_beans, i_east, i_west],
-    # Operators
-    [o_move1, o_move2, o_move3],
-    # Initial state
-    [Proposition('at', i_farmer, i_east),
-     Proposition('at', i_fox, i_east),
-     Proposition('at', i_goose, i_east),
-     Proposition('at', i_beans, i_east),
-     Proposition('other_place', i_east, i_west),
-     Proposition('other_place', i_west, i_east),
-     Proposition('other_object', i_fox, i_beans),
-     Proposition('other_object', i_beans, i_fox)],
-    # Goals
-    [Proposition('at', i_farmer, i_west),
-     Proposition('at', i_fox, i_west),
-     Proposition('at', i_goose, i_west),
-     Proposition('at', i_beans, i_west)]
-)
-
-problem.solve()
-problem.display()
-#problem.dump()
+def problems():
+    # A fresh copy of each problem of this domain, unsolved
+    problem = PlanningProblem('fox',
+        # Instances
+        [i_farmer, i_fox, i_goose, i_beans, i_east, i_west],
+        # Operators
+        [o_move1, o_move2, o_move3],
+        # Initial state
+        [Proposition('at', i_farmer, i_east),
+         Proposition('at', i_fox, i_east),
+         Proposition('at', i_goose, i_east),
+         Proposition('at', i_beans, i_east),
+         Proposition('other_place', i_east, i_west),
+         Proposition('other_place', i_west, i_east),
+         Proposition('other_object', i_fox, i_beans),
+         Proposition('other_object', i_beans, i_fox)],
+        # Goals
+        [Proposition('at', i_farmer, i_west),
+         Proposition('at', i_fox, i_west),
+         Proposition('at', i_goose, i_west),
+         Proposition('at', i_beans, i_west)]
+    )
+    return [problem]
+
+
+if __name__ == '__main__':
+    [problem] = problems()
+    problem.solve()
+    problem.display()
+    #problem.dump()
@@ -3,6 +3,37 @@
 # Translated to Python by Jonathan Li and further extended by
 # David S. Touretzky, October 2018.
 
+import argparse
+import bisect
+import concurrent.futures
+import contextlib
+import heapq
+import importlib
+import importlib.util
+import json
+import multiprocessing
+import os
+import pickle
+import sys
+import time
+from array import array
+from multiprocessing import connection, shared_memory
+
+try:
+    import numpy
+except ImportError:
+    numpy = None      # only needed for mutex_engine='numpy'
+
+try:
+    import pycosat
+except ImportError:
+    pycosat = None    # optional fast path for extraction='sat'
+
+try:
+    import resource
+except ImportError:
+    resource = None   # only needed for solve(max_memory=...)
+
 ### Constants for built-in types, predicates, and actions
 INT = 'int'
 
@@ -12,6 +43,8 @@ LESS_THAN = 'less_than'
 LESS_EQUAL = 'less_equal'
 SUM = 'sum'
 
+BUILTINS = frozenset([EQUAL, NOT_EQUAL, LESS_THAN, LESS_EQUAL, SUM])
+
 NOOP = 'noop'
 
 # To Do:  check that goals contain no variables
@@ -143,13 +176,150 @@ def validate_terms(terms):
                 raise ValueError('Arguments must be variables or instances, not %s in %s' %
                                  (repr(arg), repr(term)))
 
+### Bitsets over the dense node numbering of a graph level.
+# Every node has an index within its level, and a set of nodes at one
+# level is an int with bit (1 << node.index) set for each member.
+
+def bitmask(nodes):
+    mask = 0
+    for node in nodes:
+        mask |= 1 << node.index
+    return mask
+
+def index_mask(indices):
+    mask = 0
+    for i in indices:
+        mask |= 1 << i
+    return mask
+
+def bit_indices(mask):
+    # Yield the indices of the set bits in mask, lowest first
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+def masks_to_matrix(masks, ncols):
+    # Unpack a list of bitsets into a boolean NumPy matrix
+    nbytes = (ncols + 7) // 8
+    data = b''.join(mask.to_bytes(nbytes, 'little') for mask in masks)
+    bits = numpy.unpackbits(numpy.frombuffer(data, dtype=numpy.uint8),
+                            bitorder='little')
+    return bits.reshape(len(masks), nbytes * 8)[:, :ncols].astype(bool)
+
+def matrix_to_masks(matrix):
+    # Pack the rows of a boolean NumPy matrix into bitsets
+    packed = numpy.packbits(matrix, axis=1, bitorder='little')
+    return [int.from_bytes(row.tobytes(), 'little') for row in packed]
+
+def row_blocks(n, nblocks):
+    # Split rows 0..n-1 of a triangular pair space, where row i is paired
+    # with rows i+1..n-1, into up to nblocks ranges of about equal work
+    bounds = sorted(set(int(n * (1 - (1 - k / nblocks) ** 0.5))
+                        for k in range(nblocks)) | set([n]))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def table_rows(buf, width, start, count):
+    return [int.from_bytes(buf[i*width:(i+1)*width], 'little')
+            for i in range(start, start + count)]
+
+def action_mutex_rows(buf, width, nactions, nprev, lo, hi):
+    # The mutex pairs (a, b), a < b, for actions lo..hi-1, from a table of
+    # precondition, add and delete rows for the actions and exclude rows
+    # for the propositions of the previous level.  Same tests as
+    # ActionNode.mutex_with.
+    precs = table_rows(buf, width, 0, nactions)
+    adds = table_rows(buf, width, nactions, nactions)
+    deletes = table_rows(buf, width, 2 * nactions, nactions)
+    excludes = table_rows(buf, width, 3 * nactions, nprev)
+    pairs = array('i')
+    for a in range(lo, hi):
+        needs = 0    # propositions mutex with a precondition of a
+        for p in bit_indices(precs[a]):
+            needs |= excludes[p]
+        uses = adds[a] | precs[a]
+        delete = deletes[a]
+        for b in range(a + 1, nactions):
+            if (delete & (adds[b] | precs[b]) or deletes[b] & uses or
+                    needs & precs[b]):
+                pairs.append(a)
+                pairs.append(b)
+    return pairs
+
+def prop_mutex_rows(buf, width, nactions, nprops, lo, hi):
+    # The mutex pairs (p, q), p < q, for propositions lo..hi-1, from a
+    # table of exclude rows for the actions and adder rows for the
+    # propositions.  Same test as PropNode.excludes_prop.
+    excludes = table_rows(buf, width, 0, nactions)
+    adders = table_rows(buf, width, nactions, nprops)
+    pairs = array('i')
+    for p in range(lo, hi):
+        common = -1    # actions mutex with every adder of p
+        for a in bit_indices(adders[p]):
+            common &= excludes[a]
+        for q in range(p + 1, nprops):
+            if not adders[q] & ~common:
+                pairs.append(p)
+                pairs.append(q)
+    return pairs
+
+def shared_mutex_rows(func, name, width, m, n, lo, hi):
+    # Run func on rows lo..hi-1 of the table in shared memory block name
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return func(shm.buf, width, m, n, lo, hi)
+    finally:
+        shm.close()
+
+
+def evaluate_builtin(prec, binding):
+    # Returns True or False for a builtin precondition under binding,
+    # or None if some of its arguments are still unbound.
+    if (prec.pred == EQUAL) or (prec.pred == NOT_EQUAL):
+        arg1 = prec.args[0]
+        arg2 = prec.args[1]
+        if arg1 in binding: arg1 = binding[arg1]
+        if arg2 in binding: arg2 = binding[arg2]
+        if isinstance(arg1, Instance) and isinstance(arg2, Instance):
+            if (arg1 == arg2):
+                if (prec.pred == NOT_EQUAL) == prec.value: return False
+            elif (prec.pred == EQUAL) == prec.value: return False
+            return True
+    elif (prec.pred == LESS_THAN) or (prec.pred == LESS_EQUAL):
+        arg1 = prec.args[0]
+        arg2 = prec.args[1]
+        if arg1 in binding: arg1 = binding[arg1]
+        if arg2 in binding: arg2 = binding[arg2]
+        if isinstance(arg1, Instance) and isinstance(arg2, Instance):
+            if prec.pred == LESS_THAN:
+                return (arg1.name < arg2.name) == prec.value
+            else:
+                return (arg1.name <= arg2.name) == prec.value
+    elif prec.pred == SUM:
+        arg1 = prec.args[0]
+        arg2 = prec.args[1]
+        arg3 = prec.args[2]
+        if arg1 in binding: arg1 = binding[arg1]
+        if arg2 in binding: arg2 = binding[arg2]
+        if arg3 in binding: arg3 = binding[arg3]
+        if (isinstance(arg1, Instance) and
+            isinstance(arg2, Instance) and
+            isinstance(arg3, Instance)):
+            return (arg1.name + arg2.name == arg3.name) == prec.value
+    return None
+
 class Operator:
-    def __init__(self, name, precs, adds, deletes):
+    def __init__(self, name, precs, adds, deletes,
+                 static_precs=[], static_facts=frozenset()):
         self.name = name
         self.params = []
         self.precs = precs
         self.adds = adds
         self.deletes = deletes
+        self.static_precs = static_precs  # see specialize
+        self.static_facts = static_facts
+        self.compiled_grounder = None    # see compile_operator
+        self.compiled_effects = None
 
         self.validate_operator()
 
@@ -159,12 +329,15 @@ class Operator:
     def __repr__(self):
         return str(self)
 
+    def variables(self, prec):
+        return set(arg for arg in prec.args if isinstance(arg, Variable))
+
     def validate_operator(self):
         validate_terms(self.precs)
         validate_terms(self.adds)
         validate_terms(self.deletes)
         params = set()
-        for prec in self.precs:
+        for prec in self.precs + self.static_precs:
             for arg in prec.args:
                 if isinstance(arg, Variable):
                     params.add(arg)
@@ -174,83 +347,595 @@ class Operator:
                 if isinstance(arg, Variable) and arg not in params:
                     raise ValueError('Variable %s must be bound in the preconditions, in %s' %
                                      (repr(arg), repr(term)))
+        self.compile_grounding()
+
+    def compile_grounding(self):
+        '''
+        Plan the order in which parameters get bound, and attach each
+        builtin or static precondition to the step where all its
+        variables are bound, so it can prune partial bindings as early as
+        possible.
+
+        bind_steps is the plan for generate_bindings: (param, checks)
+        pairs.  join_steps is the plan for generate_bindings_join:
+        (prec, checks) pairs for the joined preconditions, followed by
+        join_bind_steps for the parameters that only occur in builtins.
+        initial_checks are builtins without variables.
+        '''
+        constraints = self.constraints()
+        self.initial_checks = [c for c in constraints if not self.variables(c)]
+        self.bind_steps = self.order_parameters(self.params, set(), constraints)
+
+        (self.join_steps, self.join_bind_steps) = self.join_plan()
+        # One plan per joined precondition, starting from that
+        # precondition, for generate_bindings_delta
+        self.delta_plans = [self.join_plan(prec)
+                            for (prec, checks) in self.join_steps]
+
+    def join_plan(self, first=None):
+        # (prec, checks) steps for the joined preconditions in
+        # join_order(first), and (param, checks) steps for the
+        # parameters left over
+        constraints = self.constraints()
+        steps = []
+        bound = set()
+        pending = [c for c in constraints if self.variables(c)]
+        for prec in self.join_order(first):
+            bound.update(self.variables(prec))
+            checks = [c for c in pending if self.variables(c) <= bound]
+            pending = [c for c in pending if c not in checks]
+            steps.append((prec, checks))
+        bind_steps = self.order_parameters(
+            [p for p in self.params if p not in bound], bound, pending)
+        return (steps, bind_steps)
+
+    def constraints(self):
+        # The preconditions tested on bindings rather than matched to
+        # propositions of the graph
+        return [p for p in self.precs if p.pred in BUILTINS] + self.static_precs
+
+    def specialize(self, static_preds, static_facts):
+        # A copy of this operator for a problem in which the predicates
+        # in static_preds never change: preconditions on them become
+        # static_precs, which are tested against static_facts, a set of
+        # (pred, args, value) keys, instead of being matched to nodes.
+        static = [p for p in self.precs if p.pred in static_preds]
+        if not static:
+            return self
+        return Operator(self.name,
+                        [p for p in self.precs if p.pred not in static_preds],
+                        self.adds, self.deletes, static, static_facts)
+
+    def order_parameters(self, params, bound, constraints):
+        # Greedily pick the next parameter: first the one that makes the
+        # most constraints decidable, then the one in the most
+        # constraints, then by name so the order is deterministic.
+        bound = set(bound)
+        pending = [c for c in constraints if not self.variables(c) <= bound]
+        params = sorted(params, key=lambda v: str(v.name))
+        steps = []
+        while params:
+            def score(param):
+                unbound = [self.variables(c) - bound for c in pending]
+                return (len([u for u in unbound if u == set([param])]),
+                        len([u for u in unbound if param in u]))
+            param = max(params, key=score)
+            params.remove(param)
+            bound.add(param)
+            checks = [c for c in pending if self.variables(c) <= bound]
+            pending = [c for c in pending if c not in checks]
+            steps.append((param, checks))
+        return steps
 
     def generate_bindings(self, instance_table):
         # Generate a list of dicts for possible variable bindings for
-        # this operator.  Along the way, check all preconditions to
-        # eliminate as many binding combinations as possible.
-        bindings = [{}]
-        for param in self.params:
+        # this operator.  Parameters are bound in the order planned by
+        # compile_grounding, and each builtin precondition is checked as
+        # soon as it can be decided, to eliminate as many binding
+        # combinations as possible.
+        if not self.check_constraints(self.initial_checks, {}):
+            return []
+        return self.extend_bindings([{}], self.bind_steps, instance_table)
+
+    def extend_bindings(self, bindings, steps, instance_table):
+        for (param, checks) in steps:
             newbinds = []
-            for inst in instance_table[param.kind]:
-                bindings_copy = [binding.copy() for binding in bindings]
-                for binding in bindings_copy:
-                    binding[param] = inst
-                bindings_copy = [binding for binding in bindings_copy if self.check_binding(binding)]
-                newbinds = newbinds + bindings_copy
+            for binding in bindings:
+                for inst in instance_table[param.kind]:
+                    newbind = binding.copy()
+                    newbind[param] = inst
+                    if self.check_constraints(checks, newbind):
+                        newbinds.append(newbind)
             bindings = newbinds
         #print(self.name,"#candidate bindings=",len(bindings))
         return bindings
 
-    def check_binding(self, binding):
-        # Returns True if the binding is compatible with all precondition tests.
-        # If the binding doesn't cover some variables, those tests will be skipped.
-        for prec in self.precs:
-            if (prec.pred == EQUAL) or (prec.pred == NOT_EQUAL):
-                arg1 = prec.args[0]
-                arg2 = prec.args[1]
-                if arg1 in binding: arg1 = binding[arg1]
-                if arg2 in binding: arg2 = binding[arg2]
-                if isinstance(arg1, Instance) and isinstance(arg2, Instance):
-                    if (arg1 == arg2):
-                        if (prec.pred == NOT_EQUAL) == prec.value: return False
-                    elif (prec.pred == EQUAL) == prec.value: return False
-            elif (prec.pred == LESS_THAN) or (prec.pred == LESS_EQUAL):
-                arg1 = prec.args[0]
-                arg2 = prec.args[1]
-                if arg1 in binding: arg1 = binding[arg1]
-                if arg2 in binding: arg2 = binding[arg2]
-                if isinstance(arg1, Instance) and isinstance(arg2, Instance):
-                    if prec.pred == LESS_THAN:
-                        if ((arg1.name < arg2.name) != prec.value): return False
-                    elif prec.pred == LESS_EQUAL:
-                        if ((arg1.name <= arg2.name) != prec.value): return False
-            elif prec.pred == SUM:
-                arg1 = prec.args[0]
-                arg2 = prec.args[1]
-                arg3 = prec.args[2]
-                if arg1 in binding: arg1 = binding[arg1]
-                if arg2 in binding: arg2 = binding[arg2]
-                if arg3 in binding: arg3 = binding[arg3]
-                if (isinstance(arg1, Instance) and
-                    isinstance(arg2, Instance) and
-                    isinstance(arg3, Instance)):
-                    if (arg1.name + arg2.name == arg3.name) != prec.value: return False
+    def check_constraints(self, checks, binding):
+        for prec in checks:
+            if not self.evaluate(prec, binding):
+                return False
         return True
 
-    def generate_bindprops(self, propnodes, instance_table):
-        bindings = self.generate_bindings(instance_table)
+    def evaluate(self, prec, binding):
+        # evaluate_builtin, extended to static preconditions, which hold
+        # if their instance is one of the static facts
+        if prec.pred in BUILTINS:
+            return evaluate_builtin(prec, binding)
+        args = tuple(binding.get(arg, arg) for arg in prec.args)
+        for arg in args:
+            if isinstance(arg, Variable):
+                return None
+        return (prec.pred, args, prec.value) in self.static_facts
+
+    def join_order(self, first=None):
+        # Order the non-builtin preconditions for joining: at each step
+        # take the one with the fewest variables not yet bound, so that
+        # each lookup is keyed on as many bound arguments as possible.
+        # If first is given, the order starts with it.
+        remaining = [p for p in self.precs if p.pred not in BUILTINS]
+        bound = set()
+        order = []
+        if first is not None:
+            remaining.remove(first)
+            order.append(first)
+            bound.update(self.variables(first))
+        while remaining:
+            prec = min(remaining, key=lambda p: len(
+                [a for a in p.args if isinstance(a, Variable) and a not in bound]))
+            remaining.remove(prec)
+            order.append(prec)
+            bound.update(a for a in prec.args if isinstance(a, Variable))
+        return order
+
+    def generate_bindings_join(self, facts, instance_table):
+        # Like generate_bindings, but variables that occur in a
+        # non-builtin precondition are bound by matching that
+        # precondition against the propositions actually present at the
+        # level (a relational join), instead of trying every instance.
+        if not self.check_constraints(self.initial_checks, {}):
+            return []
+        return self.join_bindings([{}], self.join_steps, self.join_bind_steps,
+                                  facts, instance_table)
+
+    def join_bindings(self, bindings, steps, bind_steps, facts,
+                      instance_table):
+        for (prec, checks) in steps:
+            newbinds = []
+            for binding in bindings:
+                for fact in facts.candidates(prec, binding):
+                    newbind = facts.match(prec, fact, binding)
+                    if (newbind is not None and
+                            self.check_constraints(checks, newbind)):
+                        newbinds.append(newbind)
+            bindings = newbinds
+        # Variables that only occur in builtin preconditions
+        return self.extend_bindings(bindings, bind_steps, instance_table)
+
+    def generate_bindings_delta(self, facts, new_facts, instance_table):
+        # The bindings of generate_bindings_join(facts) that match at
+        # least one precondition to a proposition in new_facts (a
+        # semi-naive join): each plan in delta_plans matches its first
+        # precondition against new_facts and the rest against facts.
+        # A binding that matches several new propositions is returned
+        # once for each of them.
+        if not self.check_constraints(self.initial_checks, {}):
+            return []
+        bindings = []
+        for (steps, bind_steps) in self.delta_plans:
+            ((first, checks), rest) = (steps[0], steps[1:])
+            seeds = []
+            for fact in new_facts.candidates(first, {}):
+                seed = new_facts.match(first, fact, {})
+                if seed is not None and self.check_constraints(checks, seed):
+                    seeds.append(seed)
+            bindings += self.join_bindings(seeds, rest, bind_steps, facts,
+                                           instance_table)
+        return bindings
+
+    def generate_bindprops(self, propindex, instance_table,
+                           grounding='product', facts=None):
+        # propindex maps propnum to the node for that proposition at the
+        # current level, and BindProp.propnodes holds those nodes.
+        # grounding='join' needs the FactIndex of the level.
+        if grounding == 'compiled':
+            return self.generate_bindprops_compiled(propindex, instance_table)
+        elif grounding == 'join':
+            bindings = self.generate_bindings_join(facts, instance_table)
+        else:
+            bindings = self.generate_bindings(instance_table)
         bindprops = []
-        builtins = set([EQUAL, NOT_EQUAL, LESS_THAN, LESS_EQUAL, SUM])
         for bind in bindings:
             props = []
             for prec in self.precs:
-                if prec.pred not in builtins:
+                if prec.pred not in BUILTINS:
                     bprec = prec.instantiate(bind)
-                    pnodes = [pn for pn in propnodes if pn.prop == bprec]
-                    if (len(pnodes) == 0):
+                    pnode = propindex.get(bprec.propnum, None)
+                    if pnode is None:
                         props = None
                         break
                     else:
-                        props.append(pnodes[0])
-            bindprops = (bindprops + [BindProp(bind, props)] if props is not None else bindprops)
+                        props.append(pnode)
+            if props is not None:
+                bindprops.append(BindProp(bind, props))
+        return bindprops
+
+    def instantiate_effects(self, bp):
+        # The add and delete propositions of the action for bp
+        if bp.values is not None:
+            return self.compiled_effects(*bp.values)
+        return ([prop.instantiate(bp.bindings) for prop in self.adds],
+                [prop.instantiate(bp.bindings) for prop in self.deletes])
+
+    def compile_operator(self):
+        '''
+        The operator compiler (grounding='compiled').  compile_operator
+        generates the source of two functions specialized to this operator
+        and caches them:
+
+        grounder(domains, propindex, prophash) enumerates the bindings in
+        the order of bind_steps, with one nested loop per parameter.  Each
+        parameter value lives in a local variable, and every precondition is
+        tested in the loop where its last variable gets bound: builtins as
+        inline comparisons, static preconditions as lookups in the static
+        facts, other preconditions as lookups of their interned proposition
+        in prophash and of its node in propindex.  It returns (values,
+        propnodes) pairs.
+
+        effects(*values) instantiates the adds and deletes.
+        '''
+        order = [param for (param, checks) in self.bind_steps]
+        slots = dict((param, 'v%d' % i) for (i, param) in enumerate(order))
+        consts = dict()    # Instance -> name in the generated code
+        def term(arg):
+            if isinstance(arg, Variable):
+                return slots[arg]
+            if arg not in consts:
+                consts[arg] = 'c%d' % len(consts)
+            return consts[arg]
+        def args_tuple(prec):
+            return '(' + ''.join(term(arg) + ', ' for arg in prec.args) + ')'
+
+        # Attach each precondition to the step that binds its last variable
+        nsteps = len(order)
+        tests = [[] for i in range(nsteps + 1)]
+        precnum = dict()    # non-builtin prec -> its position in propnodes
+        for prec in self.precs + self.static_precs:
+            step = max([order.index(v) + 1 for v in self.variables(prec)] + [0])
+            if prec.pred not in BUILTINS and prec not in self.static_precs:
+                precnum[id(prec)] = len(precnum)
+            tests[step].append(prec)
+
+        lines = ['def grounder(domains, propindex, prophash):',
+                 '    result = []']
+        def emit_tests(step, indent, skip):
+            for prec in tests[step]:
+                a = [term(arg) for arg in prec.args]
+                if prec.pred in (EQUAL, NOT_EQUAL):
+                    test = '%s == %s' % (a[0], a[1])
+                    holds = (prec.pred == EQUAL) == prec.value
+                elif prec.pred == LESS_THAN:
+                    test = '%s.name < %s.name' % (a[0], a[1])
+                    holds = prec.value
+                elif prec.pred == LESS_EQUAL:
+                    test = '%s.name <= %s.name' % (a[0], a[1])
+                    holds = prec.value
+                elif prec.pred == SUM:
+                    test = '%s.name + %s.name == %s.name' % (a[0], a[1], a[2])
+                    holds = prec.value
+                elif id(prec) not in precnum:
+                    test = '(%r, %s, %r) in static' % (
+                        prec.pred, args_tuple(prec), prec.value)
+                    holds = True
+                else:
+                    p = 'p%d' % precnum[id(prec)]
+                    lines.append(indent + 'prop = prophash.get((%r, %s, %r), None)' %
+                                 (prec.pred, args_tuple(prec), prec.value))
+                    lines.append(indent + 'if prop is None: %s' % skip)
+                    lines.append(indent + '%s = propindex.get(prop.propnum, None)' % p)
+                    lines.append(indent + 'if %s is None: %s' % (p, skip))
+                    continue
+                if holds:
+                    lines.append(indent + 'if not (%s): %s' % (test, skip))
+                else:
+                    lines.append(indent + 'if %s: %s' % (test, skip))
+        emit_tests(0, '    ', 'return result')
+        indent = '    '
+        for (i, param) in enumerate(order):
+            lines.append(indent + 'for %s in domains[%d]:' % (slots[param], i))
+            indent += '    '
+            emit_tests(i + 1, indent, 'continue')
+        lines.append(indent + 'result.append(((%s), [%s]))' % (
+            ''.join(slots[param] + ', ' for param in order),
+            ', '.join('p%d' % i for i in range(len(precnum)))))
+        lines.append('    return result')
+
+        def new_props(props):
+            return '[' + ', '.join('new(%r, %s, %r)' %
+                                   (prop.pred, args_tuple(prop), prop.value)
+                                   for prop in props) + ']'
+        lines.append('')
+        lines.append('def effects(%s):' % ', '.join(slots[p] for p in order))
+        lines.append('    return (%s, %s)' % (new_props(self.adds),
+                                              new_props(self.deletes)))
+
+        self.compiled_source = '\n'.join(lines) + '\n'
+        namespace = dict((name, inst) for (inst, name) in consts.items())
+        namespace['new'] = UniqueProposition.new
+        namespace['static'] = self.static_facts
+        exec(compile(self.compiled_source, '<operator %s>' % self.name, 'exec'),
+             namespace)
+        self.compiled_order = order
+        self.compiled_grounder = namespace['grounder']
+        self.compiled_effects = namespace['effects']
+
+    def __getstate__(self):
+        # The compiled functions can't be pickled, but are regenerated
+        # on demand
+        state = self.__dict__.copy()
+        state['compiled_grounder'] = None
+        state['compiled_effects'] = None
+        return state
+
+    def generate_bindprops_compiled(self, propindex, instance_table):
+        if self.compiled_grounder is None:
+            self.compile_operator()
+        order = self.compiled_order
+        domains = [instance_table[param.kind] for param in order]
+        return [BindProp(dict(zip(order, values)), propnodes, values)
+                for (values, propnodes) in
+                self.compiled_grounder(domains, propindex,
+                                       UniqueProposition.prophash)]
+
+
+class ParallelGrounder:
+    '''
+    Grounds a problem's operators in a process pool (workers=n).  Each
+    operator is split into tasks by chunks of the domain of the first
+    parameter that compile_operator binds.  The level's propositions are
+    pickled once into a shared memory block, which each worker reads and
+    interns the first time it gets a task of that level, so a task only
+    carries its chunk bounds.  A worker runs the compiled grounder on its
+    chunk and sends back (value positions, precondition IDs) tuples,
+    where an ID is the position of a proposition in the list given to
+    start().  Collecting an operator's chunks in order gives the same
+    bindings in the same order as the serial grounding.
+    '''
+
+    def __init__(self, operators, instance_table, workers):
+        self.operators = operators
+        self.instance_table = instance_table
+        self.workers = workers
+        self.pool = concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=init_grounding_worker,
+            initargs=(operators, instance_table))
+        self.futures = dict()    # Operator -> futures of its chunks
+        self.level = -1
+        self.shm = None          # the propositions of the current level
+
+    def start(self, props):
+        # Submit the grounding of every operator against props
+        self.release()
+        self.level += 1
+        keys = pickle.dumps([(prop.pred, tuple(prop.args), prop.value)
+                             for prop in props])
+        self.shm = shared_memory.SharedMemory(create=True, size=len(keys))
+        self.shm.buf[:len(keys)] = keys
+        for (opnum, op) in enumerate(self.operators):
+            if op.compiled_grounder is None:
+                op.compile_operator()
+            order = op.compiled_order
+            n = len(self.instance_table[order[0].kind]) if order else 1
+            size = max(1, -(-n // self.workers))
+            self.futures[op] = [
+                self.pool.submit(ground_chunk, opnum, lo, lo + size,
+                                 self.level, self.shm.name, len(keys))
+                for lo in range(0, n, size)]
+
+    def release(self):
+        # Free the shared block once no task of its level is left
+        if self.shm is None:
+            return
+        concurrent.futures.wait([future for futures in self.futures.values()
+                                 for future in futures])
+        self.futures.clear()
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+
+    def bindprops(self, op, nodes=None):
+        # The BindProps of op, with precondition IDs mapped through
+        # nodes if given
+        order = op.compiled_order
+        domains = [self.instance_table[param.kind] for param in order]
+        bindprops = []
+        for future in self.futures.pop(op):
+            for (positions, ids) in future.result():
+                values = tuple(domain[i] for (domain, i) in
+                               zip(domains, positions))
+                if nodes is not None:
+                    ids = [nodes[i] for i in ids]
+                bindprops.append(BindProp(dict(zip(order, values)),
+                                          list(ids), values))
         return bindprops
 
+    def shutdown(self):
+        self.release()
+        self.pool.shutdown()
+
+
+# State of a parallel grounding worker process
+grounding_worker = dict()
+
+def init_grounding_worker(operators, instance_table):
+    grounding_worker['operators'] = operators
+    grounding_worker['instance_table'] = instance_table
+    grounding_worker['positions'] = dict(
+        (kind, dict((inst, i) for (i, inst) in enumerate(insts)))
+        for (kind, insts) in instance_table.items())
+    grounding_worker['level'] = None
+
+def ground_chunk(opnum, lo, hi, level, name, size):
+    # Ground operator opnum with its first parameter restricted to
+    # positions lo..hi-1 of its domain, against the propositions of the
+    # level, pickled in the first size bytes of shared memory block name
+    if grounding_worker['level'] != level:
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            keys = pickle.loads(bytes(shm.buf[:size]))
+        finally:
+            shm.close()
+        grounding_worker['propindex'] = dict(
+            (UniqueProposition.new(*key).propnum, i)
+            for (i, key) in enumerate(keys))
+        grounding_worker['level'] = level
+    op = grounding_worker['operators'][opnum]
+    if op.compiled_grounder is None:
+        op.compile_operator()
+    table = grounding_worker['instance_table']
+    domains = [table[param.kind] for param in op.compiled_order]
+    if domains:
+        domains[0] = domains[0][lo:hi]
+    positions = [grounding_worker['positions'][param.kind]
+                 for param in op.compiled_order]
+    return [(tuple(pos[v] for (pos, v) in zip(positions, values)), ids)
+            for (values, ids) in
+            op.compiled_grounder(domains, grounding_worker['propindex'],
+                                 UniqueProposition.prophash)]
+
+
+class FactIndex:
+    '''
+    The propositions present at a graph level, indexed by predicate and
+    by predicate and argument position, for join-based grounding
+    (grounding='join').  Propositions are only ever added as the graph
+    grows, so one index is extended level by level.
+    '''
+
+    def __init__(self, instance_table):
+        self.by_pred = dict()    # (pred, value) -> [prop]
+        self.by_arg = dict()     # (pred, value, position, instance) -> [prop]
+        self.kinds = dict((kind, set(insts))
+                          for (kind, insts) in instance_table.items())
+
+    def extend(self, props):
+        for prop in props:
+            self.by_pred.setdefault((prop.pred, prop.value), []).append(prop)
+            for (i, arg) in enumerate(prop.args):
+                key = (prop.pred, prop.value, i, arg)
+                self.by_arg.setdefault(key, []).append(prop)
+
+    def candidates(self, prec, binding):
+        # The smallest list of propositions consistent with the bound
+        # arguments of prec
+        best = self.by_pred.get((prec.pred, prec.value), [])
+        for (i, arg) in enumerate(prec.args):
+            arg = binding.get(arg, arg)
+            if isinstance(arg, Instance):
+                props = self.by_arg.get((prec.pred, prec.value, i, arg), [])
+                if len(props) < len(best):
+                    best = props
+        return best
+
+    def match(self, prec, fact, binding):
+        # Extend binding so that prec instantiates to fact, or return None
+        if len(prec.args) != len(fact.args):
+            return None
+        newbind = None
+        for (arg, inst) in zip(prec.args, fact.args):
+            if isinstance(arg, Variable):
+                value = binding.get(arg, None)
+                if newbind is not None and value is None:
+                    value = newbind.get(arg, None)
+                if value is None:
+                    if inst not in self.kinds.get(arg.kind, ()):
+                        return None
+                    if newbind is None:
+                        newbind = binding.copy()
+                    newbind[arg] = inst
+                elif value != inst:
+                    return None
+            elif arg != inst:
+                return None
+        return newbind if newbind is not None else binding
+
+
+class GroundAction:
+    '''
+    An operator instance in an ActionCache: its bindings, key, and the
+    interned propositions of its preconditions, adds and deletes.
+    '''
+
+    def __init__(self, op, bindings, precs, adds, deletes):
+        self.op = op
+        self.bindings = bindings
+        self.key = action_key(op.name, bindings, None)
+        self.precs = precs
+        self.precnums = [prop.propnum for prop in precs]
+        self.adds = adds
+        self.deletes = deletes
+
+    def __repr__(self):
+        return 'Ground<%s %s>' % (self.op.name, self.bindings)
+
+
+class ActionCache:
+    '''
+    The ground actions of a problem's operators, for grounding='cached'.
+    Propositions are only ever added as the graph grows, so an operator
+    instance whose preconditions are present at one level is present at
+    every later one.  Each instance is therefore ground only once:
+    extend() takes the propositions that are new at a level and grounds
+    just the bindings that use at least one of them.  The graph selects
+    its actions from the table instead of grounding the operators again.
+    '''
+
+    def __init__(self, operators, instance_table):
+        self.operators = operators
+        self.instance_table = instance_table
+        self.facts = FactIndex(instance_table)
+        self.actions = []        # GroundAction, in the order ground
+        self.keys = set()
+        self.extended = False
+
+    def __len__(self):
+        return len(self.actions)
+
+    def extend(self, props):
+        # Add props to the facts and return the newly ground actions
+        new_facts = FactIndex(self.instance_table)
+        new_facts.extend(props)
+        self.facts.extend(props)
+        added = []
+        for op in self.operators:
+            if op.join_steps:
+                bindings = op.generate_bindings_delta(self.facts, new_facts,
+                                                      self.instance_table)
+            elif not self.extended:
+                # Only builtin preconditions: applicable from the start
+                bindings = op.generate_bindings(self.instance_table)
+            else:
+                continue
+            for binding in bindings:
+                key = action_key(op.name, binding, None)
+                if key not in self.keys:
+                    self.keys.add(key)
+                    added.append(self.ground(op, binding))
+        self.extended = True
+        self.actions.extend(added)
+        return added
+
+    def ground(self, op, binding):
+        precs = [prec.instantiate(binding) for prec in op.precs
+                 if prec.pred not in BUILTINS]
+        (adds, deletes) = op.instantiate_effects(BindProp(binding, None))
+        return GroundAction(op, binding, precs, adds, deletes)
+
 
 class BindProp:
-    def __init__(self, bindings, propnodes):
+    def __init__(self, bindings, propnodes, values=None):
         self.bindings = bindings
         self.propnodes = propnodes
+        self.values = values    # parameter values, from compiled grounding
 
     def __str__(self):
         return 'Bind<' + str(self.bindings) + ';' + str(self.propnodes) + '>'
@@ -261,10 +946,10 @@ class BindProp:
     def preconditions_excluded(self):
         # return the first propNode for which its
         # excluded preconditions are also in self.propnodes
+        precmask = bitmask(self.propnodes)
         for pn in self.propnodes:
-            for q in pn.excludes:
-                if q in self.propnodes:
-                    return pn
+            if pn.excludes & precmask:
+                return pn
         return None
 
 class PropNode:
@@ -275,10 +960,11 @@ class PropNode:
         self.prop = prop
         self.level = level
         self.propnum = prop.propnum
+        self.index = None      # dense number within the level
         self.adders = []
         self.deleters = []
         self.users = []
-        self.excludes = []
+        self.excludes = 0      # bitset of excluded PropNodes at this level
 
     def __repr__(self):
         pname = str(self.prop)
@@ -287,11 +973,14 @@ class PropNode:
     def dump_str(self):
         return '%3d:%s' % (self.propnum, str(self))
 
+    def mark_excluded(self, node):
+        self.excludes |= 1 << node.index
+
     def excludes_prop(self, pnode):
+        addermask = bitmask(pnode.adders)
         for anode in self.adders:
-            for anode2 in pnode.adders:
-                if anode2 not in anode.excludes:
-                    return None
+            if addermask & ~anode.excludes:
+                return None
 
         return True
 
@@ -327,6 +1016,11 @@ class PropNode:
         '''
         return hash(str(self))
 
+def action_key(name, binds, precs):
+    if name == NOOP:
+        return (NOOP, precs[0].propnum)
+    return (name,) + tuple(sorted(binds.items(), key=lambda vb: vb[0].name))
+
 class ActionNode:
     node_counter = 0
 
@@ -339,7 +1033,16 @@ class ActionNode:
         self.precs = precs
         self.adds = []
         self.deletes = []
-        self.excludes = []
+        # key identifies the same ground action at different levels
+        self.key = action_key(name, binds, precs)
+        self.index = None      # dense number within the level
+        self.excludes = 0      # bitset of excluded ActionNodes at this level
+        # Bitsets of the precondition, add and delete PropNodes.  A
+        # proposition carried forward by a noop keeps its index at the
+        # next level, so precmask and delmask can be compared directly.
+        self.precmask = 0
+        self.addmask = 0
+        self.delmask = 0
 
     def __repr__(self):
         if self.name == NOOP:
@@ -354,40 +1057,634 @@ class ActionNode:
     def dump_str(self):
         return '%3d-%s' % (self.number, str(self))
 
+    def mark_excluded(self, node):
+        self.excludes |= 1 << node.index
+
+    def update_masks(self):
+        self.precmask = bitmask(self.precs)
+        self.addmask = bitmask(self.adds)
+        self.delmask = bitmask(self.deletes)
+
     def deletes_addition(self, anode):
         # determines if the intersection is non-empty
-        intersection = [x for x in self.deletes if x in anode.adds]
-        return len(intersection) > 0
+        return self.delmask & anode.addmask != 0
 
     def deletes_precondition(self, anode):
         # does deleted prop at level i+1 match precondition prop at level i?
-        for d in self.deletes:
-            for p in anode.precs:
-                if d.prop == p.prop:
-                    return True
-        return False
+        return self.delmask & anode.precmask != 0
 
     def competing_needs(self, anode):
         for p in self.precs:
-            for p2 in anode.precs:
-                if p2 in p.excludes:
-                    return True
+            if p.excludes & anode.precmask:
+                return True
         return False
 
+    def mutex_with(self, anode):
+        # Symmetric form of the tests in generate_action_excludes_links
+        return (
+            self.deletes_addition(anode) or anode.deletes_addition(self) or
+            self.deletes_precondition(anode) or
+            anode.deletes_precondition(self) or
+            self.competing_needs(anode)
+        )
+
+def luby(i):
+    # The i-th term (from 0) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, ...
+    size = 1
+    seq = 0
+    while size < i + 1:
+        seq += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        seq -= 1
+        i = i % size
+    return 1 << seq
+
+
+class SatSolver:
+    '''
+    A small CDCL SAT solver for extraction='sat': unit propagation with
+    two watched literals, first-UIP clause learning with backjumping,
+    VSIDS-style variable activities with saved phases, and Luby restarts.
+    Literals are nonzero ints as in DIMACS: v or -v for variable v, from
+    1 to nvars.  solve() returns a model as a list of booleans indexed by
+    variable, or None if the clauses are unsatisfiable.  It calls decide,
+    if given, before each decision; decide can stop the search by raising.
+    '''
+
+    restart_base = 100
+    activity_decay = 0.95
+
+    def __init__(self, nvars):
+        self.nvars = nvars
+        self.clauses = []
+        self.watches = [[] for i in range(2 * nvars + 1)]  # by lit + nvars
+        self.units = []
+        self.empty = False
+        self.assigns = [0] * (nvars + 1)    # 1 true, -1 false, 0 free
+        self.levels = [0] * (nvars + 1)
+        self.reasons = [None] * (nvars + 1) # index of implying clause
+        self.activity = [0.0] * (nvars + 1)
+        self.phase = [-1] * (nvars + 1)
+        self.var_inc = 1.0
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.heap = [(0.0, v) for v in range(1, nvars + 1)]
+        self.stats = dict(decisions=0, conflicts=0, restarts=0)
+
+    def add_clause(self, lits):
+        lits = list(dict.fromkeys(lits))
+        if len(set(abs(lit) for lit in lits)) < len(lits):
+            return    # contains v and -v
+        if not lits:
+            self.empty = True
+        elif len(lits) == 1:
+            self.units.append(lits[0])
+        else:
+            self.attach(lits)
+
+    def attach(self, lits):
+        # Store a clause watching its first two literals
+        self.clauses.append(lits)
+        ci = len(self.clauses) - 1
+        self.watches[lits[0] + self.nvars].append(ci)
+        self.watches[lits[1] + self.nvars].append(ci)
+        return ci
+
+    def value(self, lit):
+        return self.assigns[lit] if lit > 0 else -self.assigns[-lit]
+
+    def assign(self, lit, reason):
+        v = abs(lit)
+        self.assigns[v] = 1 if lit > 0 else -1
+        self.levels[v] = len(self.trail_lim)
+        self.reasons[v] = reason
+        self.trail.append(lit)
+
+    def propagate(self):
+        # Returns the index of a conflicting clause, or None
+        assigns = self.assigns
+        clauses = self.clauses
+        watches = self.watches
+        nvars = self.nvars
+        while self.qhead < len(self.trail):
+            false_lit = -self.trail[self.qhead]
+            self.qhead += 1
+            watching = watches[false_lit + nvars]
+            kept = []
+            for (i, ci) in enumerate(watching):
+                c = clauses[ci]
+                if c[0] == false_lit:
+                    c[0] = c[1]
+                    c[1] = false_lit
+                first = c[0]
+                if (assigns[first] if first > 0 else -assigns[-first]) == 1:
+                    kept.append(ci)
+                    continue
+                for k in range(2, len(c)):
+                    lit = c[k]
+                    if (assigns[lit] if lit > 0 else -assigns[-lit]) != -1:
+                        c[1] = lit
+                        c[k] = false_lit
+                        watches[lit + nvars].append(ci)
+                        break
+                else:
+                    kept.append(ci)
+                    if (assigns[first] if first > 0 else -assigns[-first]) == -1:
+                        kept.extend(watching[i+1:])
+                        watches[false_lit + nvars] = kept
+                        return ci
+                    self.assign(first, ci)
+            watches[false_lit + nvars] = kept
+        return None
+
+    def analyze(self, conflict):
+        # First-UIP learning: returns the learnt clause, with the
+        # asserting literal first, and the level to jump back to
+        seen = set()
+        learnt = [None]
+        level = len(self.trail_lim)
+        pending = 0
+        lit = None
+        index = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for q in (clause if lit is None else clause[1:]):
+                v = abs(q)
+                if v not in seen and self.levels[v] > 0:
+                    seen.add(v)
+                    self.bump(v)
+                    if self.levels[v] == level:
+                        pending += 1
+                    else:
+                        learnt.append(q)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            lit = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[self.reasons[abs(lit)]]
+        learnt[0] = -lit
+        if len(learnt) == 1:
+            return (learnt, 0)
+        # Watch the literal of the highest remaining level second
+        best = max(range(1, len(learnt)),
+                   key=lambda i: self.levels[abs(learnt[i])])
+        (learnt[1], learnt[best]) = (learnt[best], learnt[1])
+        return (learnt, self.levels[abs(learnt[1])])
+
+    def bump(self, v):
+        self.activity[v] += self.var_inc
+        if self.activity[v] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.var_inc *= 1e-100
+            self.heap = [(-self.activity[u], u)
+                         for u in range(1, self.nvars + 1)
+                         if self.assigns[u] == 0]
+            heapq.heapify(self.heap)
+        elif self.assigns[v] == 0:
+            heapq.heappush(self.heap, (-self.activity[v], v))
+
+    def backtrack(self, level):
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        for lit in self.trail[start:]:
+            v = abs(lit)
+            self.phase[v] = self.assigns[v]
+            self.assigns[v] = 0
+            self.reasons[v] = None
+            heapq.heappush(self.heap, (-self.activity[v], v))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+    def pick_branch(self):
+        while self.heap:
+            (activity, v) = heapq.heappop(self.heap)
+            if self.assigns[v] == 0 and -activity == self.activity[v]:
+                return v
+        for v in range(1, self.nvars + 1):
+            if self.assigns[v] == 0:
+                return v
+        return None
+
+    def solve(self, decide=None):
+        if self.empty:
+            return None
+        for lit in self.units:
+            if self.value(lit) == -1:
+                return None
+            if self.value(lit) == 0:
+                self.assign(lit, None)
+        restarts = 0
+        limit = SatSolver.restart_base * luby(restarts)
+        conflicts = 0
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.stats['conflicts'] += 1
+                conflicts += 1
+                if not self.trail_lim:
+                    return None
+                (learnt, level) = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learnt) == 1:
+                    self.assign(learnt[0], None)
+                else:
+                    self.assign(learnt[0], self.attach(learnt))
+                self.var_inc /= SatSolver.activity_decay
+                if conflicts >= limit:
+                    self.backtrack(0)
+                    restarts += 1
+                    self.stats['restarts'] += 1
+                    limit = SatSolver.restart_base * luby(restarts)
+                    conflicts = 0
+            else:
+                v = self.pick_branch()
+                if v is None:
+                    return [a == 1 for a in self.assigns]
+                if decide is not None:
+                    decide()
+                self.stats['decisions'] += 1
+                self.trail_lim.append(len(self.trail))
+                self.assign(v if self.phase[v] == 1 else -v, None)
+
+
+def solve_cnf(nvars, clauses, decide=None):
+    # A model of clauses as a list of booleans indexed by variable, or
+    # None if they are unsatisfiable.  Uses pycosat if it is installed,
+    # otherwise SatSolver, which calls decide at each of its decisions.
+    if pycosat is not None:
+        model = pycosat.solve(clauses)
+        if model == 'UNSAT':
+            return None
+        values = [False] * (nvars + 1)
+        for lit in model:
+            values[abs(lit)] = lit > 0
+        return values
+    solver = SatSolver(nvars)
+    for clause in clauses:
+        solver.add_clause(clause)
+    return solver.solve(decide)
+
+
+class GoalsetMemo:
+    '''
+    The goal sets found unsolvable at one level, for solve_goals, in a
+    set-trie over the propnums of the goals.  A superset of an unsolvable
+    goal set is unsolvable too, so contains_subset(goals) is true if any
+    stored set is a subset of goals, not only an identical one.
+    '''
+
+    def __init__(self):
+        self.root = dict()   # propnum -> child; the key None ends a set
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, goals):
+        self.add_propnums(g.propnum for g in goals)
+
+    def add_propnums(self, propnums):
+        node = self.root
+        for propnum in sorted(set(propnums)):
+            node = node.setdefault(propnum, dict())
+        if None not in node:
+            node[None] = True
+            self.count += 1
+
+    def __iter__(self):
+        # The stored sets, as tuples of propnums
+        stack = [(self.root, ())]
+        while stack:
+            (node, path) = stack.pop()
+            for (key, child) in node.items():
+                if key is None:
+                    yield path
+                else:
+                    stack.append((child, path + (key,)))
+
+    def contains_subset(self, goals):
+        return self.find_subset(goals) is not None
+
+    def find_subset(self, goals):
+        # The propnums of a stored set that is a subset of goals, or None
+        keys = sorted(set(g.propnum for g in goals))
+        stack = [(self.root, 0, ())]
+        while stack:
+            (node, i, path) = stack.pop()
+            if None in node:
+                return frozenset(path)
+            for j in range(i, len(keys)):
+                child = node.get(keys[j], None)
+                if child is not None:
+                    stack.append((child, j + 1, path + (keys[j],)))
+        return None
+
+
+class NogoodChannel:
+    '''
+    A shared, append-only log of unsolvable goal sets, through which the
+    workers of extraction='parallel' pass on what they learn.  It is made
+    before the workers are forked, so they all see the same memory; each
+    record is the level, the size and the propnums of one goal set, and
+    every process keeps its own read position.  Once the log is full,
+    further goal sets are just not shared.
+    '''
+
+    def __init__(self, context, size=1 << 20):
+        self.log = context.RawArray('q', size)   # log[0] is the end
+        self.log[0] = 1
+        self.lock = context.Lock()
+        self.position = 1
+
+    def publish(self, level, goals):
+        keys = sorted(set(g.propnum for g in goals))
+        with self.lock:
+            end = self.log[0]
+            if end + 2 + len(keys) > len(self.log):
+                return
+            self.log[end] = level
+            self.log[end + 1] = len(keys)
+            self.log[end + 2:end + 2 + len(keys)] = keys
+            self.log[0] = end + 2 + len(keys)
+
+    def receive(self, memos):
+        # Add the goal sets published since the last call to memos, a
+        # GoalsetMemo per level
+        with self.lock:
+            end = self.log[0]
+        records = self.log[self.position:end]
+        i = 0
+        while i < len(records):
+            (level, n) = records[i:i + 2]
+            memos[level].add_propnums(records[i + 2:i + 2 + n])
+            i += 2 + n
+        self.position = end
+
+
+class SupportCounter:
+    '''
+    The minimal action set test, kept up to date as the actions chosen
+    at one level of extraction are pushed and popped in stack order.
+    supporters holds the chosen actions that add each goal (by index)
+    and unique, per action, how many goals it alone adds.  An action
+    with no goal of its own is redundant, and the set is not minimal
+    once every goal is supported and some action is redundant.  Each
+    push or pop only looks at the adds of its action.
+    '''
+
+    def __init__(self, goals):
+        self.supporters = dict((g.index, []) for g in goals)
+        self.unique = dict()    # action -> goals only it adds
+        self.uncovered = len(self.supporters)
+        self.redundant = 0
+
+    def push(self, action):
+        unique = 0
+        # An operator can add the same proposition twice
+        for i in set(g.index for g in action.adds):
+            supporters = self.supporters.get(i, None)
+            if supporters is None:
+                continue
+            if not supporters:
+                self.uncovered -= 1
+                unique += 1
+            elif len(supporters) == 1:
+                # The old supporter is no longer the only one
+                other = supporters[0]
+                self.unique[other] -= 1
+                if self.unique[other] == 0:
+                    self.redundant += 1
+            supporters.append(action)
+        self.unique[action] = unique
+        if unique == 0:
+            self.redundant += 1
+
+    def pop(self, action):
+        # Undo the push of action, which must be the last one
+        if self.unique.pop(action) == 0:
+            self.redundant -= 1
+        for i in set(g.index for g in action.adds):
+            supporters = self.supporters.get(i, None)
+            if supporters is None:
+                continue
+            supporters.pop()
+            if not supporters:
+                self.uncovered += 1
+            elif len(supporters) == 1:
+                other = supporters[0]
+                if self.unique[other] == 0:
+                    self.redundant -= 1
+                self.unique[other] += 1
+
+    def minimal(self):
+        # Whether no chosen action could be left out with all the goals
+        # still supported
+        return self.uncovered > 0 or self.redundant == 0
+
+
+class ExtractionLevel:
+    '''
+    The state of the iterative extraction (extraction='iterative') at
+    one level: the goals at proposition level level+1, the chosen actions
+    and which goals each of them supports (a SupportCounter), the new
+    goals their preconditions make at level, and the achiever domains for
+    forward checking.  Choices are applied in place and undone in reverse
+    order; trail records the domains they narrowed.  The goals still open
+    are open[start:], in goal order; each choice pushes the ones it
+    leaves open on top, and its undo pops them.
+    '''
+
+    def __init__(self, level, goals, order):
+        self.level = level
+        self.goals = goals
+        self.order = order
+        self.support = SupportCounter(goals)
+        self.actions = []
+        self.new_goals = []
+        self.new_propnums = set()
+        self.mask = 0
+        self.domains = None   # see solve_goals_iterative
+        self.trail = []      # (goal index, domain before narrowing)
+        self.open = list(order)
+        self.start = 0
+
+    def next_goal(self):
+        if self.start < len(self.open):
+            return self.open[self.start]
+        return None
+
+    def open_goals(self, start):
+        # The goals on the open stack from start up, without copying them
+        return (self.open[i] for i in range(start, len(self.open)))
+
+
+class ExtractionChoice:
+    '''
+    A choice point of the iterative extraction: the achievers to try for
+    goal, the next one to try, and the marks needed to undo the one
+    currently applied.
+    '''
+
+    def __init__(self, state, goal, candidates):
+        self.state = state
+        self.goal = goal
+        self.candidates = candidates
+        self.position = 0
+        self.marks = None    # (new goal count, mask, trail length, start)
+
+
+class BudgetExceeded(Exception):
+    # Raised by SearchBudget.check to unwind solve; limit names the budget
+    def __init__(self, limit):
+        Exception.__init__(self, limit)
+        self.limit = limit
+
+
+def memory_usage():
+    # Peak resident set size of this process in bytes
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+class SearchBudget:
+    '''
+    The limits of one call of solve: max_levels graph levels,
+    max_expansion_time seconds spent extending the graph, max_nodes
+    extraction nodes, max_memory bytes of peak memory, and deadline
+    seconds overall.  None means no limit.  The graph code calls check
+    between phases and the extraction engines call node for every search
+    node; clocks and memory are only read every check_interval nodes.
+    Either raises BudgetExceeded when a limit is passed.
+    '''
+    check_interval = 256
+
+    def __init__(self, max_levels=None, max_expansion_time=None,
+                 max_nodes=None, max_memory=None, deadline=None):
+        if max_memory is not None and resource is None:
+            raise ValueError('max_memory needs the resource module')
+        self.max_levels = max_levels
+        self.max_expansion_time = max_expansion_time
+        self.max_nodes = max_nodes
+        self.max_memory = max_memory
+        self.deadline = deadline
+        self.start = time.time()
+        self.nodes = 0
+        self.expansion_time = 0.0
+        self.expanding = None   # start time of the current expansion
+
+    def start_expansion(self, level):
+        # level is the number of graph levels so far
+        if self.max_levels is not None and level >= self.max_levels:
+            raise BudgetExceeded('max_levels')
+        self.expanding = time.time()
+        self.check()
+
+    def end_expansion(self):
+        self.expansion_time += time.time() - self.expanding
+        self.expanding = None
+        self.check()
+
+    def node(self):
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise BudgetExceeded('max_nodes')
+        if self.nodes % SearchBudget.check_interval == 0:
+            self.check()
+
+    def check(self):
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise BudgetExceeded('max_nodes')
+        now = time.time()
+        if self.deadline is not None and now - self.start > self.deadline:
+            raise BudgetExceeded('deadline')
+        if (self.max_expansion_time is not None and
+                self.expanding is not None and
+                self.expansion_time + now - self.expanding >
+                self.max_expansion_time):
+            raise BudgetExceeded('max_expansion_time')
+        if self.max_memory is not None and memory_usage() > self.max_memory:
+            raise BudgetExceeded('max_memory')
+
+
 class PlanningProblem:
-    def __init__(self, name, instances, operators, initial, goals):
+    mutex_engines = ('python', 'numpy', 'incremental', 'parallel')
+    goal_orders = ('given', 'constrained', 'latest')
+    achiever_orders = ('given', 'noop_first', 'noop_last', 'level')
+    extractions = ('recursive', 'iterative', 'sat', 'ddb', 'parallel')
+    # Strategies raced by solve(portfolio=True): overrides of solve's
+    # goal_order, achiever_order, forward_checking and extraction
+    default_portfolio = (dict(),
+                         dict(goal_order='constrained'),
+                         dict(achiever_order='noop_first'),
+                         dict(achiever_order='noop_last'),
+                         dict(goal_order='latest', achiever_order='level'),
+                         dict(extraction='ddb'))
+    parallel_mutex_min = 256     # smaller levels are not worth a pool
+    groundings = ('product', 'join', 'compiled', 'cached')
+
+    def __init__(self, name, instances, operators, initial, goals,
+                 mutex_engine='python', grounding='product', workers=None):
+        if mutex_engine not in PlanningProblem.mutex_engines:
+            raise ValueError('Unknown mutex engine: %s' % repr(mutex_engine))
+        if grounding not in PlanningProblem.groundings:
+            raise ValueError('Unknown grounding: %s' % repr(grounding))
+        if workers is not None and grounding not in ('product', 'compiled'):
+            raise ValueError('workers requires grounding \'product\' or \'compiled\'')
+        if mutex_engine == 'numpy' and numpy is None:
+            raise ValueError('mutex_engine=\'numpy\' requires NumPy')
         self.name = name
         self.instances = instances
         self.operators = operators
         self.initial = initial
         self.goals = goals
         self.propLevels = []
+        self.propIndexes = []    # per level: propnum -> PropNode
         self.actionLevels = []
+        self.actionIndexes = []  # per level: ActionNode.key -> ActionNode
         self.level = -1
-        self.unsolvable_goalsets = [dict()]
+        self.unsolvable_goalsets = [GoalsetMemo()]
         self.result = None
+        self.goal_order = 'given'       # see solve
+        self.achiever_order = 'given'
+        self.forward_checking = True
+        self.extraction = 'recursive'
+        self.extraction_workers = None
+        self.portfolio = None
+        self.portfolio_stats = []   # per strategy, for solve(portfolio=...)
+        self.branch = None          # for the workers of solve_goals_parallel
+        self.nogood_channel = None
+        self.budget = None          # SearchBudget, while solving with limits
+        self.start_time = None
+        self.fixpoint = None        # see leveled_off
+        self.outcome = None         # see solve
+        self.stats = dict(nodes=0, backtracks=0, cutoffs=0, backjumps=0)
+        self.prop_first_level = dict()    # propnum -> level
+        self.action_first_level = dict()  # ActionNode.key -> level
+        self.mutex_engine = mutex_engine
+        self.grounding = grounding
+        self.workers = workers
+        self.grounder = None     # ParallelGrounder, while solving
+        self.mutex_pool = None   # for mutex_engine='parallel'
 
         self.generate_instance_table()
+        self.analyze_domain()
+        if grounding == 'join':
+            self.facts = FactIndex(self.instance_table)
+        else:
+            self.facts = None
+        if grounding == 'cached':
+            self.action_cache = ActionCache(self.operators,
+                                            self.instance_table)
+        else:
+            self.action_cache = None
         self.populate_prop_level_0()
 
         validate_terms(initial)
@@ -401,63 +1698,183 @@ class PlanningProblem:
             if inst not in self.instance_table[inst.kind]:
                 self.instance_table[inst.kind].append(inst)
 
+    def analyze_domain(self):
+        '''
+        Find the static predicates, which no operator adds or deletes.
+        Their propositions hold at every level exactly when they hold
+        initially, so they are left out of the planning graph: the
+        operators are specialized to test static preconditions against
+        the initial state while grounding, and static goals are checked
+        once here.  graph_goals are the remaining goals.
+        '''
+        changed = set(prop.pred for op in self.operators
+                      for prop in op.adds + op.deletes)
+        used = set(prop.pred for op in self.operators for prop in op.precs)
+        used.update(prop.pred for prop in self.initial + self.goals)
+        self.static_preds = used - changed - BUILTINS
+        self.static_facts = frozenset(
+            (prop.pred, tuple(prop.args), prop.value) for prop in self.initial
+            if prop.pred in self.static_preds)
+        self.operators = [op.specialize(self.static_preds, self.static_facts)
+                          for op in self.operators]
+        self.graph_goals = [g for g in self.goals
+                            if g.pred not in self.static_preds]
+        self.failed_static_goals = [
+            g for g in self.goals if g.pred in self.static_preds and
+            (g.pred, tuple(g.args), g.value) not in self.static_facts]
+
     def populate_prop_level_0(self):
         self.propLevels = [[]]
+        self.propIndexes = [dict()]
         for prop in self.initial:
-            self.propLevels[0].append(PropNode(prop, 0))
+            if prop.pred not in self.static_preds:
+                self.get_propnode(prop, 0)
+        self.propCounts = [len(self.propLevels[0])]  # per level
+        self.propExcludeCounts = [0]   # per level: number of prop mutexes
 
     def extend_graph_level(self):
         # Generate next levels of action and proposition nodes
+        if self.fixpoint is not None:
+            self.repeat_fixpoint()
+            return
         self.actionLevels.append([])
+        self.actionIndexes.append(dict())
         self.propLevels.append([])
-        self.unsolvable_goalsets.append(dict())
+        self.propIndexes.append(dict())
+        self.unsolvable_goalsets.append(GoalsetMemo())
         self.level += 1
         print("Generating level", self.level, '-> level', self.level+1)
 
-        self.generate_noop_actions()
+        first = len(self.propLevels[-3]) if self.level > 0 else 0
+        if self.facts is not None:
+            self.facts.extend(pn.prop for pn in self.propLevels[-2][first:])
 
-        for op in self.operators:
-            self.generate_operator_actions(op)
+        self.generate_noop_actions()
 
-        self.generate_action_excludes_links()
-        self.generate_proposition_excludes_links()
+        if self.action_cache is not None:
+            self.action_cache.extend(
+                [pn.prop for pn in self.propLevels[-2][first:]])
+            # Every cached action has its preconditions at this level
+            self.generate_cached_actions(self.action_cache.actions)
+        else:
+            if self.workers is not None:
+                self.start_workers([pn.prop for pn in self.propLevels[-2]])
+            for op in self.operators:
+                self.check_budget()
+                self.generate_operator_actions(op)
+        self.check_budget()
+
+        # The mutex engine counts the proposition mutex pairs it marks
+        self.propExcludeCounts.append(0)
+        if self.mutex_engine == 'numpy':
+            self.generate_excludes_links_numpy()
+        elif self.mutex_engine == 'parallel':
+            self.generate_excludes_links_parallel()
+        elif self.mutex_engine == 'incremental':
+            self.generate_action_excludes_links_incremental()
+            self.generate_proposition_excludes_links_incremental()
+        else:
+            self.generate_action_excludes_links()
+            self.generate_proposition_excludes_links()
+        self.propCounts.append(len(self.propLevels[-1]))
+        self.check_fixpoint()
+
+    def repeat_fixpoint(self):
+        # Past the fixpoint a new level is the same as the last one, so
+        # refer to its nodes instead of copying them
+        self.actionLevels.append(self.actionLevels[-1])
+        self.actionIndexes.append(self.actionIndexes[-1])
+        self.propLevels.append(self.propLevels[-1])
+        self.propIndexes.append(self.propIndexes[-1])
+        self.propCounts.append(self.propCounts[-1])
+        self.propExcludeCounts.append(self.propExcludeCounts[-1])
+        self.unsolvable_goalsets.append(GoalsetMemo())
+        self.level += 1
+        print("Generating level", self.level, '-> level', self.level+1,
+              '(same as level %d)' % self.fixpoint)
+
+    def check_fixpoint(self):
+        # Propositions are only ever added from one level to the next and
+        # mutexes only ever removed, so a level whose proposition and
+        # mutex counts did not change is the same as the level before it.
+        # The mutex engines count the pairs as they mark or drop them.
+        if (self.propCounts[-1] == self.propCounts[-2] and
+                self.propExcludeCounts[-1] == self.propExcludeCounts[-2]):
+            self.fixpoint = self.level + 1
 
     def generate_noop_actions(self):
         for pnode in self.propLevels[-2]:
             anode = ActionNode(NOOP, pnode.level, dict(), [pnode])
             pnode.users.append(anode)
-            pnode2 = PropNode(pnode.prop, 1 + pnode.level)
+            pnode2 = self.add_propnode(PropNode(pnode.prop, 1 + pnode.level))
             anode.adds.append(pnode2)
             pnode2.adders.append(anode)
-            self.propLevels[-1].append(pnode2)
-            self.actionLevels[-1].append(anode)
+            anode.update_masks()
+            self.add_actionnode(anode)
+
+    def start_workers(self, props):
+        if self.grounder is None:
+            self.grounder = ParallelGrounder(self.operators,
+                                             self.instance_table, self.workers)
+        self.grounder.start(props)
+
+    def shutdown_workers(self):
+        if self.grounder is not None:
+            self.grounder.shutdown()
+            self.grounder = None
+        if self.mutex_pool is not None:
+            self.mutex_pool.shutdown()
+            self.mutex_pool = None
 
     def generate_operator_actions(self, op):
-        bindprops = op.generate_bindprops(self.propLevels[-2], self.instance_table)
+        if self.grounder is not None:
+            bindprops = self.grounder.bindprops(op, self.propLevels[-2])
+        else:
+            bindprops = op.generate_bindprops(self.propIndexes[-2],
+                                              self.instance_table,
+                                              self.grounding, self.facts)
         # print(op.name, "#bindprops=", len(bindprops))
         bindprops = [bp for bp in bindprops
                      if bp.preconditions_excluded() is None]
-        self.actionLevels[-1] += [self.generate_action_node(op,bp)
-                                  for bp in bindprops]
-
-    def generate_action_node(self, op, bp):
-        # op = operator, bp = bindProp
+        for bp in bindprops:
+            self.add_actionnode(self.generate_action_node(op,bp))
+
+    def generate_cached_actions(self, actions):
+        propindex = self.propIndexes[-2]
+        for action in actions:
+            bp = BindProp(action.bindings,
+                          [propindex[n] for n in action.precnums])
+            if bp.preconditions_excluded() is None:
+                self.add_actionnode(self.generate_action_node(
+                    action.op, bp, (action.adds, action.deletes)))
+
+    def generate_action_node(self, op, bp, effects=None):
+        # op = operator, bp = bindProp, effects = (adds, deletes) if known
         anode = ActionNode(op.name, self.level, bp.bindings, bp.propnodes)
         for pnode in bp.propnodes:
             pnode.users.append(anode)
 
+        (adds, deletes) = effects or op.instantiate_effects(bp)
         anode.adds = [
-            self.get_propnode(prop.instantiate(bp.bindings), self.level+1) for prop in op.adds
+            self.get_propnode(prop, self.level+1) for prop in adds
         ]
         for pnode in anode.adds:
             pnode.adders.append(anode)
 
         anode.deletes = [
-            self.get_propnode(prop.instantiate(bp.bindings), self.level+1) for prop in op.deletes
+            self.get_propnode(prop, self.level+1) for prop in deletes
         ]
         for pnode in anode.deletes:
             pnode.deleters.append(anode)
-            
+
+        anode.update_masks()
+        return anode
+
+    def add_actionnode(self, anode):
+        anode.index = len(self.actionLevels[-1])
+        self.actionLevels[-1].append(anode)
+        self.actionIndexes[-1][anode.key] = anode
+        self.action_first_level.setdefault(anode.key, anode.level)
         return anode
 
     def generate_action_excludes_links(self):
@@ -469,67 +1886,385 @@ class PlanningProblem:
                             anode.deletes_precondition(bnode) or
                             anode.competing_needs(bnode)
                     ):
-                        if (bnode not in anode.excludes):
-                            anode.excludes.append(bnode)
-                        if (anode not in bnode.excludes):
-                            bnode.excludes.append(anode)
+                        anode.mark_excluded(bnode)
+                        bnode.mark_excluded(anode)
 
     def generate_proposition_excludes_links(self):
+        # The test is symmetric, so each pair is tested once
         for pnode in self.propLevels[-1]:
-            for pnode2 in self.propLevels[-1]:
-                if pnode != pnode2 and pnode.excludes_prop(pnode2):
-                    pnode.excludes.append(pnode2)
+            for pnode2 in self.propLevels[-1][:pnode.index]:
+                if pnode.excludes_prop(pnode2):
+                    self.mark_props_excluded(pnode, pnode2)
+
+    def mark_props_excluded(self, pnode, pnode2):
+        # Mark a mutex pair of the new proposition level, and count it
+        # for check_fixpoint
+        pnode.mark_excluded(pnode2)
+        pnode2.mark_excluded(pnode)
+        self.propExcludeCounts[-1] += 1
+
+    '''
+    The incremental engine relies on the monotonicity of the planning
+    graph: nodes are never removed from one level to the next, and a pair
+    of nodes that is not mutex at one level is not mutex at any later
+    level.  So a pair of nodes that both existed at the previous level
+    only needs testing if it was mutex there, and only pairs involving a
+    new node need the full test.
+    '''
+
+    def generate_action_excludes_links_incremental(self):
+        if len(self.actionLevels) < 2:
+            return self.generate_action_excludes_links()
+        actions = self.actionLevels[-1]
+        previous = self.actionIndexes[-2]
+        # renumber[i] is the new node for the action with index i at the
+        # previous level
+        renumber = [None] * len(self.actionLevels[-2])
+        old_nodes = []
+        new_nodes = []
+        for anode in actions:
+            prev = previous.get(anode.key, None)
+            if prev is None:
+                new_nodes.append(anode)
+            else:
+                renumber[prev.index] = anode
+                old_nodes.append((anode, prev))
+
+        for (anode, prev) in old_nodes:
+            for i in bit_indices(prev.excludes):
+                bnode = renumber[i]
+                if (bnode is not None and anode.index < bnode.index and
+                        anode.mutex_with(bnode)):
+                    anode.mark_excluded(bnode)
+                    bnode.mark_excluded(anode)
+
+        newmask = bitmask(new_nodes)
+        for anode in new_nodes:
+            for bnode in actions:
+                if bnode is anode:
+                    continue
+                if bnode.index < anode.index and newmask >> bnode.index & 1:
+                    continue    # pair already tested from bnode's side
+                if anode.mutex_with(bnode):
+                    anode.mark_excluded(bnode)
+                    bnode.mark_excluded(anode)
+
+    def generate_proposition_excludes_links_incremental(self):
+        # Propositions carried forward by noops keep their index, so the
+        # old propositions are exactly the first len(propLevels[-2]).
+        props = self.propLevels[-1]
+        nold = len(self.propLevels[-2])
+        for pnode in props[:nold]:
+            prev = self.propLevels[-2][pnode.index]
+            for i in bit_indices(prev.excludes):
+                pnode2 = props[i]
+                if pnode.index < i and pnode.excludes_prop(pnode2):
+                    self.mark_props_excluded(pnode, pnode2)
+
+        for pnode in props[nold:]:
+            for pnode2 in props[:pnode.index]:
+                if pnode.excludes_prop(pnode2):
+                    self.mark_props_excluded(pnode, pnode2)
+
+    def generate_excludes_links_numpy(self):
+        '''
+        Vectorized equivalent of generate_action_excludes_links followed by
+        generate_proposition_excludes_links.  The actions of the new level
+        become action x proposition incidence matrices for preconditions,
+        adds and deletes, with columns indexed by the propositions of the
+        new level (a carried-forward proposition keeps its index, so
+        preconditions fit in the same columns), and each mutex rule is a
+        matrix product.
+        '''
+        actions = self.actionLevels[-1]
+        props = self.propLevels[-1]
+        nprev = len(self.propLevels[-2])
+        precs = masks_to_matrix([a.precmask for a in actions], len(props))
+        adds = masks_to_matrix([a.addmask for a in actions], len(props))
+        deletes = masks_to_matrix([a.delmask for a in actions], len(props))
+        precs_f = precs.astype(numpy.float32)
+        adds_f = adds.astype(numpy.float32)
+        deletes_f = deletes.astype(numpy.float32)
+
+        # Interference: one action deletes an add or a precondition of
+        # the other.  Competing needs: mutex preconditions at the
+        # previous level.
+        interference = (deletes_f @ (adds_f + precs_f).T) > 0
+        prev_excl = masks_to_matrix([p.excludes for p in self.propLevels[-2]],
+                                    nprev).astype(numpy.float32)
+        prev_precs = precs_f[:, :nprev]
+        competing = (prev_precs @ prev_excl @ prev_precs.T) > 0
+        action_excl = interference | interference.T | competing
+        numpy.fill_diagonal(action_excl, False)
+        for anode, mask in zip(actions, matrix_to_masks(action_excl)):
+            anode.excludes = mask
+
+        # Two propositions are mutex if no pair of their adders is
+        # compatible.  An action is compatible with itself.
+        compatible = (~action_excl).astype(numpy.float32)
+        supported = (adds_f.T @ compatible) @ adds_f
+        prop_excl = supported == 0
+        numpy.fill_diagonal(prop_excl, False)
+        for pnode, mask in zip(props, matrix_to_masks(prop_excl)):
+            pnode.excludes = mask
+        self.propExcludeCounts[-1] = int(numpy.count_nonzero(prop_excl)) // 2
     
 
+    def generate_excludes_links_parallel(self):
+        '''
+        Equivalent of generate_action_excludes_links followed by
+        generate_proposition_excludes_links, on a pool of processes
+        (workers, or one per core).  For each phase the level is written
+        to a shared memory table of bitset rows: preconditions, adds and
+        deletes of the actions plus the excludes of the previous level's
+        propositions, then the new action excludes plus the adders of the
+        propositions.  Each worker tests a block of rows against all the
+        later rows and returns its mutex pairs as a packed array.
+        '''
+        actions = self.actionLevels[-1]
+        props = self.propLevels[-1]
+        previous = self.propLevels[-2]
+        rows = ([a.precmask for a in actions] + [a.addmask for a in actions] +
+                [a.delmask for a in actions] + [p.excludes for p in previous])
+        for (a, b) in self.mutex_pairs(action_mutex_rows, rows, len(props),
+                                       len(actions), len(previous),
+                                       len(actions)):
+            actions[a].mark_excluded(actions[b])
+            actions[b].mark_excluded(actions[a])
+
+        rows = ([a.excludes for a in actions] +
+                [bitmask(p.adders) for p in props])
+        for (p, q) in self.mutex_pairs(prop_mutex_rows, rows, len(actions),
+                                       len(actions), len(props), len(props)):
+            self.mark_props_excluded(props[p], props[q])
+
+    def mutex_pairs(self, func, rows, nbits, m, n, ntested):
+        # Apply func, with table sizes m and n, to the table of rows of
+        # nbits bits, split into blocks of the first ntested rows, and
+        # yield the pairs it finds
+        width = max(1, (nbits + 7) // 8)
+        table = b''.join(row.to_bytes(width, 'little') for row in rows)
+        if ntested < PlanningProblem.parallel_mutex_min:
+            results = [func(memoryview(table), width, m, n, 0, ntested)]
+        else:
+            workers = self.workers or os.cpu_count() or 1
+            if self.mutex_pool is None:
+                self.mutex_pool = concurrent.futures.ProcessPoolExecutor(
+                    workers)
+            shm = shared_memory.SharedMemory(create=True, size=len(table))
+            try:
+                shm.buf[:len(table)] = table
+                futures = [self.mutex_pool.submit(shared_mutex_rows, func,
+                                                  shm.name, width, m, n,
+                                                  lo, hi)
+                           for (lo, hi) in row_blocks(ntested, 4 * workers)]
+                results = [future.result() for future in futures]
+            finally:
+                shm.close()
+                shm.unlink()
+        for pairs in results:
+            for i in range(0, len(pairs), 2):
+                yield (pairs[i], pairs[i+1])
+
     def leveled_off(self):
         '''
-        The graph has leveled off if the last level contains no new
-        propositions, and the same number of exclusion relationships as the
-        level before it
+        The graph has leveled off once a level has the same propositions
+        and proposition mutexes as the level before it; every later level
+        would be the same again.  The graph code keeps the counts that
+        check_fixpoint compares, so this is a constant-time test, and sets
+        fixpoint to the first of the identical proposition levels.  Levels
+        past it are added by repeat_fixpoint, which builds no new nodes.
         '''
-        if len(self.propLevels) < 2:
-            return None
+        return self.fixpoint is not None
 
-        if len(self.propLevels[-1]) != len(self.propLevels[-2]):
-            return None
+    '''
+    Queries on the planning graph by level.  Extraction and dump() go
+    through these, so other graph representations only need to override
+    them.
+    '''
 
-        this_excludes = 0
-        for prop in self.propLevels[-1]:
-            this_excludes += len(prop.excludes)
-            
-        prev_excludes = 0
-        for prop in self.propLevels[-2]:
-            prev_excludes += len(prop.excludes)
+    def level_props(self, level):
+        # The PropNodes at a level, in index order
+        return self.propLevels[level]
 
-        if this_excludes != prev_excludes:
-            return None
+    def level_actions(self, level):
+        # The ActionNodes at a level, in index order
+        return self.actionLevels[level]
 
-        return True
+    def achievers(self, pnode, level):
+        # The actions that add pnode at the given proposition level.  Past
+        # the fixpoint, the preconditions of its actions are nodes of the
+        # level below it, which has the same propositions by index.
+        if level > pnode.level:
+            pnode = self.propLevels[level][pnode.index]
+        return pnode.adders
+
+    def excludes_at(self, node, level):
+        # Bitset of the nodes that are mutex with node at the given level
+        return node.excludes
 
     def get_existing_propnode(self, prop, level):
-        for pnode in self.propLevels[level]:
-            if pnode.prop == prop:
-                return pnode
-        return None
+        return self.propIndexes[level].get(prop.propnum, None)
 
     def get_propnode(self, prop, level):
         pnode = self.get_existing_propnode(prop, level)
         if pnode is not None:
             return pnode
-        pnode = PropNode(prop, level)
-        self.propLevels[level].append(pnode)
+        return self.add_propnode(PropNode(prop, level))
+
+    def add_propnode(self, pnode):
+        pnode.index = len(self.propLevels[pnode.level])
+        self.propLevels[pnode.level].append(pnode)
+        self.propIndexes[pnode.level][pnode.propnum] = pnode
+        self.prop_first_level.setdefault(pnode.propnum, pnode.level)
         return pnode
 
-    def solve(self):
+    def first_level(self, node):
+        # The level where a proposition or action first appears
+        if isinstance(node, PropNode):
+            return self.prop_first_level[node.propnum]
+        return self.action_first_level[node.key]
+
+    def order_goals(self, goals, level):
+        # goals, at level, in the order solve_goals should work on them
+        if self.goal_order == 'constrained':
+            # Fewest achievers first
+            return sorted(goals, key=lambda g: len(self.achievers(g, level)))
+        elif self.goal_order == 'latest':
+            # Goals that appeared at a later level first
+            return sorted(goals, key=lambda g: -self.first_level(g))
+        return goals
+
+    def order_achievers(self, actions):
+        if self.achiever_order == 'noop_first':
+            return sorted(actions, key=lambda a: a.name != NOOP)
+        elif self.achiever_order == 'noop_last':
+            return sorted(actions, key=lambda a: a.name == NOOP)
+        elif self.achiever_order == 'level':
+            # Cheapest first: the action that appeared at the earliest level
+            return sorted(actions, key=self.first_level)
+        return actions
+
+    def solve(self, goal_order='given', achiever_order='given',
+              forward_checking=True, extraction='recursive', portfolio=None,
+              extraction_workers=None, max_levels=None,
+              max_expansion_time=None, max_nodes=None, max_memory=None,
+              deadline=None):
+        '''
+        goal_order is the order in which solve_goals works on the goals
+        of a level: 'given' (by propnum), 'constrained' (fewest achievers
+        first) or 'latest' (latest first appearance first).
+        achiever_order is the order in which it tries their achievers:
+        'given' (creation order), 'noop_first', 'noop_last' or 'level'
+        (earliest first appearance first).  With forward_checking, each
+        goal still to be achieved at a level keeps a domain of the
+        achievers compatible with the actions selected so far, and a
+        selection that empties a domain is cut off at once.  stats counts
+        the search nodes, backtracks and cutoffs.  extraction picks the
+        search engine: 'recursive' (solve_goals), 'iterative'
+        (solve_goals_iterative), 'sat' (solve_sat), 'ddb'
+        (solve_goals_ddb) or 'parallel' (solve_goals_parallel).
+        portfolio is a sequence of strategies, dicts overriding any of
+        these four settings, to race against each other at every level
+        (see solve_portfolio); True picks default_portfolio.
+        extraction_workers is the number of workers of
+        extraction='parallel', by default one per core; the workers
+        option of the problem only sizes the grounding and mutex pools.
+
+        max_levels, max_expansion_time, max_nodes, max_memory and deadline
+        bound the search (see SearchBudget).  When one is passed, solve
+        stops and returns None.  Either way it leaves in outcome the
+        status ('solved', 'unsolvable' or 'limit'), the limit hit, the
+        number of graph levels, the extraction nodes and the time taken.
+        '''
+        if goal_order not in PlanningProblem.goal_orders:
+            raise ValueError('Unknown goal order: %s' % repr(goal_order))
+        if achiever_order not in PlanningProblem.achiever_orders:
+            raise ValueError('Unknown achiever order: %s' %
+                             repr(achiever_order))
+        if extraction not in PlanningProblem.extractions:
+            raise ValueError('Unknown extraction: %s' % repr(extraction))
+        if extraction_workers is not None:
+            if extraction != 'parallel':
+                raise ValueError('extraction_workers requires extraction '
+                                 '\'parallel\'')
+            if extraction_workers < 1:
+                raise ValueError('extraction_workers must be at least 1')
+        if portfolio is True:
+            portfolio = PlanningProblem.default_portfolio
+        if portfolio is not None:
+            portfolio = [self.check_strategy(s, extraction)
+                         for s in portfolio]
+            if not portfolio:
+                raise ValueError('Empty portfolio')
+        limits = (max_levels, max_expansion_time, max_nodes, max_memory,
+                  deadline)
+        budget = None
+        if limits != (None,) * len(limits):
+            budget = SearchBudget(*limits)
         print('Solving', self.name, '...')
         PropNode.node_counter = 0
         ActionNode.node_counter = 0
         if self.level != -1:
             raise ValueError('Problem has already been solved.')
+        self.goal_order = goal_order
+        self.achiever_order = achiever_order
+        self.forward_checking = forward_checking
+        self.extraction = extraction
+        self.extraction_workers = extraction_workers
+        self.portfolio = portfolio
+        if portfolio is not None:
+            self.portfolio_stats = [
+                dict(strategy=s, runs=0, wins=0, failures=0, cancelled=0,
+                     limits=0, nodes=0, backtracks=0, time=0.0)
+                for s in portfolio]
+        self.stats = dict(nodes=0, backtracks=0, cutoffs=0, backjumps=0)
+        self.budget = budget
+        self.start_time = time.time()
+        if self.failed_static_goals:
+            print('Static goal props never hold:', self.failed_static_goals)
+            print('Problem has no solution!')
+            return self.finish('unsolvable')
+        try:
+            return self.search()
+        except BudgetExceeded as e:
+            self.shutdown_workers()
+            print('Stopped at level %d: %s exceeded' % (self.level + 1,
+                                                        e.limit))
+            return self.finish('limit', e.limit)
+
+    def finish(self, status, limit=None):
+        # Record the outcome of solve and return its result
+        self.outcome = dict(status=status, limit=limit, levels=self.level + 1,
+                            nodes=self.stats['nodes'],
+                            time=time.time() - self.start_time)
+        if self.budget is not None:
+            self.outcome['expansion_time'] = self.budget.expansion_time
+        self.budget = None
+        return self.result if status == 'solved' else None
+
+    def check_budget(self):
+        if self.budget is not None:
+            self.budget.check()
+
+    def count_node(self):
+        # Count an extraction node against the stats and the budget
+        self.stats['nodes'] += 1
+        if self.budget is not None:
+            self.budget.node()
+
+    def search(self):
+        # The body of solve: extend the graph and extract until a plan is
+        # found or terminate() says there is none
+        goals = []
         while not self.terminate():
+            if self.budget is not None:
+                self.budget.start_expansion(self.level + 1)
             self.extend_graph_level()
+            if self.budget is not None:
+                self.budget.end_expansion()
             goals = [self.get_existing_propnode(g, self.level+1)
-                     for g in self.goals]
+                     for g in self.graph_goals]
             if None in goals:
                 print('Some goal props not instantiated at level %d' % \
                       (self.level+1))
@@ -537,68 +2272,745 @@ class PlanningProblem:
                 print('Some goals are mutually exclusive at level %d' % \
                       (self.level+1))
             else:
-                result = self.solve_goals(goals, [], goals, [])
+                if self.portfolio is not None:
+                    result = self.solve_portfolio(goals)
+                else:
+                    result = self.extract(goals)
                 if result is not None:
                     print('Generated %d proposition nodes and %d action nodes total.' % \
                           (PropNode.node_counter, ActionNode.node_counter))
-                    return result
+                    self.shutdown_workers()
+                    self.result = result
+                    return self.finish('solved')
                 else:
                     print('No solution at level %d with %d proposition nodes and %d action nodes' % \
                         (self.level + 1, PropNode.node_counter, ActionNode.node_counter))
+        self.shutdown_workers()
         print('Problem has no solution!  Generated %d proposition nodes and %d action nodes total.' % \
               (PropNode.node_counter, ActionNode.node_counter))
         print(goals)
-        return None
+        return self.finish('unsolvable')
+
+    def check_strategy(self, strategy, extraction):
+        # A checked copy of a portfolio strategy.  Its worker is a daemon
+        # process, which cannot fork the workers of parallel extraction,
+        # whether the strategy sets it or takes it from solve's extraction.
+        allowed = dict(goal_order=PlanningProblem.goal_orders,
+                       achiever_order=PlanningProblem.achiever_orders,
+                       forward_checking=(True, False),
+                       extraction=PlanningProblem.extractions)
+        for (key, value) in strategy.items():
+            if key not in allowed:
+                raise ValueError('Unknown strategy setting: %s' % repr(key))
+            if value not in allowed[key]:
+                raise ValueError('Unknown %s: %s' % (key, repr(value)))
+        if strategy.get('extraction', extraction) == 'parallel':
+            raise ValueError('A portfolio strategy cannot use '
+                             'extraction \'parallel\'')
+        return dict(strategy)
+
+    def extract(self, goals):
+        # Search for a plan for goals at the top level with the current
+        # extraction engine
+        if self.extraction == 'iterative':
+            return self.solve_goals_iterative(goals)
+        elif self.extraction == 'ddb':
+            return self.solve_goals_ddb(goals)
+        elif self.extraction == 'parallel':
+            return self.solve_goals_parallel(goals)
+        elif self.extraction == 'sat':
+            result = self.solve_sat(goals)
+            if result is None:
+                self.record_sat_failure(goals)
+            return result
+        return self.solve_goals(goals, [], goals, [])
+
+    def record_sat_failure(self, goals):
+        '''
+        Memoize what a SAT failure proves for terminate(): the goals are
+        unsolvable at the top level, and so are the subgoals, one level
+        down, of every way of achieving them.  The backward search would
+        add a goal set at the level below exactly when some minimal action
+        set for the goals leads to subgoals not covered by that level's
+        memo, and terminate() only compares the memo sizes of those two
+        levels.  So once the graph has leveled off, one such subgoal set
+        is looked for and memoized, instead of searching the levels below.
+        '''
+        top = self.level + 1
+        if not self.unsolvable_goalsets[top].contains_subset(goals):
+            self.unsolvable_goalsets[top].add(goals)
+        if self.leveled_off():
+            subgoals = self.unmemoized_subgoals(goals)
+            if subgoals is not None:
+                self.unsolvable_goalsets[top - 1].add(subgoals)
+
+    def unmemoized_subgoals(self, goals):
+        # The preconditions of the first non-mutex, minimal set of
+        # actions achieving goals at the top level that are not a superset
+        # of a goal set memoized below it, or None if there is none
+        level = self.level
+        memo = self.unsolvable_goalsets[level]
+        support = SupportCounter(goals)
+        def choose(remaining, chosen, mask):
+            self.count_node()
+            if not remaining:
+                subgoals = list(dict((p.propnum, p) for a in chosen
+                                     for p in a.precs).values())
+                if memo.contains_subset(subgoals):
+                    return None
+                return subgoals
+            for a in self.achievers(remaining[0], level + 1):
+                if self.excludes_at(a, level) & mask:
+                    continue
+                support.push(a)
+                subgoals = None
+                if support.minimal():
+                    subgoals = choose([g for g in remaining
+                                       if g not in a.adds],
+                                      chosen + [a], mask | (1 << a.index))
+                support.pop(a)
+                if subgoals is not None:
+                    return subgoals
+            return None
+        return choose(goals, [], 0)
+
+    def solve_portfolio(self, goals):
+        '''
+        Race the strategies of the portfolio on the goals at the top
+        level.  One process is forked per strategy, so each gets a copy
+        of the graph and memo as they are now, and sends back its plan as
+        action indexes per level, the unsolvable goal sets it knows of and
+        its stats, which count towards those of the problem and its
+        budget.  The first plan received wins and the other workers are
+        terminated.  The goal sets of the workers that failed are merged
+        into the memo; if none of them finished once the graph has leveled
+        off, the backward search runs here instead.
+        If no worker finished because each ran out of its search budget,
+        neither did the portfolio.  Per-strategy totals are kept in
+        portfolio_stats.
+        '''
+        context = multiprocessing.get_context('fork')
+        pending = dict()     # connection -> strategy index
+        workers = []
+        for (i, strategy) in enumerate(self.portfolio):
+            (receiver, sender) = context.Pipe(False)
+            worker = context.Process(target=self.run_strategy,
+                                     args=(strategy, goals, sender),
+                                     daemon=True)
+            worker.start()
+            sender.close()
+            pending[receiver] = i
+            workers.append((worker, receiver))
+            self.portfolio_stats[i]['runs'] += 1
+        result = None
+        failed = False
+        limit = None
+        while pending and result is None:
+            for receiver in connection.wait(list(pending)):
+                i = pending.pop(receiver)
+                stats = self.portfolio_stats[i]
+                try:
+                    (plan, nogoods, run_stats, elapsed,
+                     run_limit) = receiver.recv()
+                except EOFError:
+                    # The worker died without an answer
+                    stats['failures'] += 1
+                    continue
+                stats['nodes'] += run_stats['nodes']
+                stats['backtracks'] += run_stats['backtracks']
+                stats['time'] += elapsed
+                for key in run_stats:
+                    self.stats[key] += run_stats[key]
+                if self.budget is not None:
+                    self.budget.nodes += run_stats['nodes']
+                if run_limit is not None:
+                    stats['limits'] += 1
+                    limit = run_limit
+                elif plan is None:
+                    failed = True
+                    stats['failures'] += 1
+                    for (level, keys) in nogoods:
+                        self.unsolvable_goalsets[level].add_propnums(keys)
+                elif result is None:
+                    stats['wins'] += 1
+                    result = self.plan_actions(plan)
+                    print('Solution found at level %d by strategy %d: %s' %
+                          (self.level + 1, i, self.portfolio[i]))
+        for i in pending.values():
+            self.portfolio_stats[i]['cancelled'] += 1
+        for (worker, receiver) in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+            receiver.close()
+        if result is None and not failed and limit is not None:
+            raise BudgetExceeded(limit)
+        if result is None:
+            # The workers' nodes add up, past what each of them allowed
+            self.check_budget()
+        if result is None and not failed and self.leveled_off():
+            result = self.solve_goals(goals, [], goals, [])
+        self.result = result
+        return result
+
+    def run_strategy(self, strategy, goals, sender):
+        # The body of a portfolio worker, in a forked copy of the problem
+        sys.stdout = open(os.devnull, 'w')
+        self.goal_order = strategy.get('goal_order', self.goal_order)
+        self.achiever_order = strategy.get('achiever_order',
+                                           self.achiever_order)
+        self.forward_checking = strategy.get('forward_checking',
+                                             self.forward_checking)
+        self.extraction = strategy.get('extraction', self.extraction)
+        self.stats = dict(nodes=0, backtracks=0, cutoffs=0, backjumps=0)
+        start = time.time()
+        limit = None
+        try:
+            result = self.extract(goals)
+        except BudgetExceeded as e:
+            (result, limit) = (None, e.limit)
+        elapsed = time.time() - start
+        plan = nogoods = None
+        if result is not None:
+            plan = self.plan_indexes(result)
+        elif limit is None:
+            nogoods = [(level, keys)
+                       for (level, memo) in enumerate(self.unsolvable_goalsets)
+                       for keys in memo]
+        sender.send((plan, nogoods, self.stats, elapsed, limit))
+        sender.close()
+
+    def plan_indexes(self, plan):
+        # A plan as action indexes per level, to send between processes
+        return [[a.index for a in actions] for actions in plan]
+
+    def plan_actions(self, indexes):
+        # The inverse of plan_indexes
+        return [[self.level_actions(level)[index] for index in level_indexes]
+                for (level, level_indexes) in enumerate(indexes)]
+
+    def solve_goals_parallel(self, goals):
+        '''
+        Backward search with the top level split into disjoint branches
+        (extraction='parallel'), searched by a pool of forked workers
+        (extraction_workers, or one per core).  A branch fixes the
+        achievers of the first goal or two at the top level, by position
+        in their achiever_order (see extraction_branches); below that
+        each worker runs solve_goals as usual.  The unsolvable goal sets the workers
+        learn are shared through a NogoodChannel.  The first plan found
+        wins and the other workers are terminated; if every branch fails,
+        the shared goal sets and the top goal set go into the memo.  A
+        worker that runs out of its search budget stops the whole search.
+        '''
+        context = multiprocessing.get_context('fork')
+        count = self.extraction_workers or os.cpu_count() or 1
+        goals = sorted(goals)
+        branches = self.extraction_branches(goals, count)
+        # The workers inherit branches, and claim them by position
+        claimed = context.Value('i', 0)
+        nworkers = max(1, min(count, len(branches)))
+        self.nogood_channel = NogoodChannel(context)
+        pending = dict()     # connection -> worker
+        for i in range(nworkers):
+            (receiver, sender) = context.Pipe(False)
+            worker = context.Process(target=self.run_branches,
+                                     args=(goals, branches, claimed, sender),
+                                     daemon=True)
+            worker.start()
+            sender.close()
+            pending[receiver] = worker
+        result = None
+        limit = None
+        try:
+            while pending and result is None and limit is None:
+                for receiver in connection.wait(list(pending)):
+                    try:
+                        (plan, stats, run_limit) = receiver.recv()
+                    except EOFError:
+                        # Out of branches, or died
+                        pending.pop(receiver).join()
+                        receiver.close()
+                        continue
+                    limit = limit or run_limit
+                    for key in stats:
+                        self.stats[key] += stats[key]
+                    if self.budget is not None:
+                        self.budget.nodes += stats['nodes']
+                    if plan is not None and result is None:
+                        result = self.plan_actions(plan)
+        finally:
+            for (receiver, worker) in pending.items():
+                worker.terminate()
+                worker.join()
+                receiver.close()
+        if result is None and limit is not None:
+            self.nogood_channel = None
+            raise BudgetExceeded(limit)
+        if result is None:
+            self.nogood_channel.receive(self.unsolvable_goalsets)
+            self.unsolvable_goalsets[self.level + 1].add(goals)
+        else:
+            print('Solution found at level %d' % (self.level + 1))
+            self.result = result
+        self.nogood_channel = None
+        return result
+
+    def extraction_branches(self, goals, count):
+        # The branches of solve_goals_parallel: positions among the
+        # ordered achievers of the first goal at the top level, paired
+        # with those of the next goal left when that gives fewer than
+        # count branches
+        if not goals:
+            return [()]
+        order = self.order_goals(goals, self.level + 1)
+        first = self.order_achievers(self.achievers(order[0], self.level + 1))
+        if len(first) >= count:
+            return [(i,) for i in range(len(first))]
+        branches = []
+        for (i, a) in enumerate(first):
+            rest = [g for g in order if g not in a.adds]
+            if not rest:
+                branches.append((i,))
+                continue
+            second = self.order_achievers(self.achievers(rest[0],
+                                                         self.level + 1))
+            branches.extend((i, j) for j in range(len(second)))
+        return branches
+
+    def run_branches(self, goals, branches, claimed, sender):
+        # The body of a solve_goals_parallel worker, in a forked copy of
+        # the problem: search branches until one succeeds or none are
+        # left.  claimed is the shared count of branches taken so far.
+        sys.stdout = open(os.devnull, 'w')
+        while True:
+            with claimed.get_lock():
+                i = claimed.value
+                claimed.value += 1
+            if i >= len(branches):
+                break
+            self.branch = branches[i]
+            self.stats = dict((key, 0) for key in self.stats)
+            try:
+                result = self.solve_goals(list(goals), [], list(goals), [])
+            except BudgetExceeded as e:
+                sender.send((None, self.stats, e.limit))
+                break
+            plan = None if result is None else self.plan_indexes(result)
+            sender.send((plan, self.stats, None))
+            if result is not None:
+                break
+        sender.close()
 
     '''
     solve_goals will recurse on the tail of the goals_remaining, but we
-    still need to keep the complete goal set around for the 
-    minimal_action_set test
+    still need to keep the complete goal set around for the minimal
+    action set test, which support keeps track of
     '''
 
-    def solve_goals(self, goals, goals_remaining, new_goals, selected_actions):
+    def solve_goals(self, goals, goals_remaining, new_goals, selected_actions,
+                    selected_mask=0, level=None, domains=None, support=None):
+        # level is the proposition level of new_goals, which defaults to
+        # the top of the graph for the initial call; goals are one level up.
+        # domains maps the index of each goal in goals_remaining to the
+        # bitset of its achievers still compatible with selected_actions,
+        # for forward checking; None at the start of a level.  support is
+        # the SupportCounter of the actions selected at this level.
+        if level is None:
+            level = self.level + 1
+        self.count_node()
         # time to advance to the next level?
         if len(goals_remaining) == 0:
-            if new_goals[0].level == 0:
+            if level == 0:
                 print('Solution found at level %d' % (self.level + 1))
                 return selected_actions
             else:
                 new_goals.sort()
-                new_goals = tuple(new_goals) # needs to be a hashable type!
-                if self.unsolvable_goalsets[new_goals[0].level].get(new_goals,None):
+                if self.nogood_channel is not None:
+                    self.nogood_channel.receive(self.unsolvable_goalsets)
+                if self.unsolvable_goalsets[level].contains_subset(new_goals):
                     #print("Found unsolvable: ", new_goals)
                     return None
-                result = self.solve_goals(new_goals, new_goals,
-                                     [], [[]] + selected_actions)
+                result = self.solve_goals(new_goals,
+                                          self.order_goals(new_goals, level),
+                                          [], [[]] + selected_actions, 0,
+                                          level-1)
                 if result is not None:
                     return result
-                else:
-                    # no action solves this goal set, so mark as unsolvable
-                    #print("--> Added unsolvable:", new_goals)
-                    self.unsolvable_goalsets[new_goals[0].level][new_goals] = True
+                # No action solves this goal set, so mark it as unsolvable,
+                # except the top goal set in a solve_goals_parallel
+                # worker, which only searched its own branch of it
+                if self.branch is not None and level == self.level + 1:
                     return None
+                #print("--> Added unsolvable:", new_goals)
+                self.unsolvable_goalsets[level].add(new_goals)
+                if self.nogood_channel is not None:
+                    self.nogood_channel.publish(level, new_goals)
+                return None
 
         # Work on the next goal at the current level
         goal = goals_remaining[0]
-        actions = goal.adders
+        if support is None:
+            support = SupportCounter(goals)
+        if self.forward_checking and domains is None:
+            domains = dict((g.index, bitmask(self.achievers(g, level + 1)))
+                           for g in goals_remaining)
+        actions = self.order_achievers(self.achievers(goal, level + 1))
+        if self.branch is not None and level == self.level:
+            # A parallel worker: the first choices at the top are fixed
+            depth = len(selected_actions[0])
+            if depth < len(self.branch):
+                actions = actions[self.branch[depth]:self.branch[depth] + 1]
         for a in actions:
-            # Make sure this action isn't excluded by any actions already selected
-            if self.safe_index(selected_actions[0], lambda s: a in s.excludes) is None:
-                new_actions = [selected_actions[0] + [a]] + selected_actions[1:]
-                if ((not self.forward_cutoff(goals_remaining[1:], new_actions[0]))
-                    and self.minimal_action_set(goals, new_actions[0])):
-                    next_goals_remaining = [g for g in goals_remaining
-                                            if g not in a.adds]
-                    next_new_goals = new_goals + [g for g in a.precs if
-                                                  g not in new_goals]
-                    result = self.solve_goals(goals, next_goals_remaining,
-                                              next_new_goals, new_actions)
-                    if result is not None:
-                        self.result = result
-                        return result
+            new_actions = [selected_actions[0] + [a]] + selected_actions[1:]
+            next_goals_remaining = [g for g in goals_remaining
+                                    if g not in a.adds]
+            if self.forward_checking:
+                # The domain only holds achievers compatible with the
+                # actions already selected
+                if not (domains[goal.index] >> a.index) & 1:
+                    continue
+                next_domains = self.narrow_domains(domains,
+                                                   next_goals_remaining,
+                                                   a, level)
+                if next_domains is None:
+                    self.stats['cutoffs'] += 1
+                    continue
+            else:
+                # Make sure this action isn't excluded by any actions already selected
+                if self.excludes_at(a, level) & selected_mask:
+                    continue
+                if self.forward_cutoff(goals_remaining[1:], new_actions[0],
+                                       level):
+                    self.stats['cutoffs'] += 1
+                    continue
+                next_domains = None
+            support.push(a)
+            if support.minimal():
+                next_new_goals = new_goals + [g for g in a.precs if
+                                              g not in new_goals]
+                result = self.solve_goals(goals, next_goals_remaining,
+                                          next_new_goals, new_actions,
+                                          selected_mask | (1 << a.index),
+                                          level, next_domains, support)
+                if result is not None:
+                    self.result = result
+                    return result
+                self.stats['backtracks'] += 1
+            support.pop(a)
 
         return None
 
+    def narrow_domains(self, domains, goals, action, level):
+        # The domains of goals once action is selected, or None if one
+        # of them becomes empty.  A new dict, so that the caller's
+        # domains are intact when it backtracks.
+        excludes = self.excludes_at(action, level)
+        narrowed = dict()
+        for g in goals:
+            domain = domains[g.index] & ~excludes
+            if not domain:
+                return None
+            narrowed[g.index] = domain
+        return narrowed
+
+    '''
+    solve_goals_iterative runs the same search as solve_goals, so it
+    finds the same plans and stores the same memo entries, but keeps its
+    state on explicit stacks: a list of ExtractionLevel from the top of
+    the graph down, and a list of ExtractionChoice.  An action is chosen
+    by updating the level's state in place and undone by reverting the
+    same updates, instead of copying goal and action lists at every
+    step, and plan length is not limited by the recursion limit.
+    '''
+
+    def solve_goals_iterative(self, goals):
+        levels = []
+        choices = []
+        status = self.enter_extraction_level(levels, goals, self.level + 1)
+        if status == 'fail':
+            return None
+        while status != 'success':
+            if status == 'call':
+                # A call of solve_goals at the current level
+                state = levels[-1]
+                goal = state.next_goal()
+                if goal is None:
+                    status = self.enter_extraction_level(
+                        levels, state.new_goals, state.level)
+                    continue
+                self.count_node()
+                if self.forward_checking and state.domains is None:
+                    state.domains = dict(
+                        (g.index, bitmask(self.achievers(g, state.level + 1)))
+                        for g in state.order)
+                choices.append(ExtractionChoice(state, goal,
+                    self.order_achievers(self.achievers(goal, state.level + 1))))
+                status = 'retry'
+            elif status == 'retry':
+                status = self.apply_next_choice(choices[-1])
+                if status == 'fail':
+                    choices.pop()
+            elif status == 'fail':
+                # The last call failed; resume its caller
+                if choices and choices[-1].state is levels[-1]:
+                    self.undo_choice(choices[-1])
+                    self.stats['backtracks'] += 1
+                    status = 'retry'
+                else:
+                    # No choice left at this level: its goal set fails
+                    state = levels.pop()
+                    self.unsolvable_goalsets[state.level + 1].add(state.goals)
+                    if not levels:
+                        return None
+        print('Solution found at level %d' % (self.level + 1))
+        self.result = [list(state.actions) for state in reversed(levels)]
+        return self.result
+
+    def enter_extraction_level(self, levels, new_goals, level):
+        # The call of solve_goals with no goals remaining: done at level
+        # 0, otherwise start on new_goals at the level below
+        self.count_node()
+        if level == 0:
+            return 'success'
+        goals = sorted(new_goals)
+        if self.unsolvable_goalsets[level].contains_subset(goals):
+            return 'fail'
+        levels.append(ExtractionLevel(level - 1, goals,
+                                      self.order_goals(goals, level)))
+        return 'call'
+
+    def apply_next_choice(self, choice):
+        # Apply the next acceptable achiever of choice.goal: 'call' if
+        # there is one, 'fail' if there are none left
+        state = choice.state
+        level = state.level
+        (start, end) = (state.start, len(state.open))
+        while choice.position < len(choice.candidates):
+            a = choice.candidates[choice.position]
+            choice.position += 1
+            if self.forward_checking:
+                if not (state.domains[choice.goal.index] >> a.index) & 1:
+                    continue
+            elif self.excludes_at(a, level) & state.mask:
+                continue
+            # Push the goals a leaves open, and a; popped if it fails
+            for i in range(start, end):
+                if state.open[i] not in a.adds:
+                    state.open.append(state.open[i])
+            state.actions.append(a)
+            if self.forward_checking:
+                narrowed = self.narrow_domains(state.domains,
+                                               state.open_goals(end),
+                                               a, level)
+                accepted = narrowed is not None
+            else:
+                narrowed = dict()
+                accepted = not self.forward_cutoff(
+                    state.open_goals(start + 1), state.actions, level)
+            if not accepted:
+                self.stats['cutoffs'] += 1
+            else:
+                state.support.push(a)
+                accepted = state.support.minimal()
+                if not accepted:
+                    state.support.pop(a)
+            if not accepted:
+                state.actions.pop()
+                del state.open[end:]
+                continue
+            choice.marks = (len(state.new_goals), state.mask,
+                            len(state.trail), start)
+            state.start = end
+            state.mask |= 1 << a.index
+            for p in a.precs:
+                if p.propnum not in state.new_propnums:
+                    state.new_propnums.add(p.propnum)
+                    state.new_goals.append(p)
+            for (i, domain) in narrowed.items():
+                state.trail.append((i, state.domains[i]))
+                state.domains[i] = domain
+            return 'call'
+        return 'fail'
+
+    def undo_choice(self, choice):
+        state = choice.state
+        (ngoals, mask, ntrail, start) = choice.marks
+        a = state.actions.pop()
+        state.mask = mask
+        del state.open[state.start:]
+        state.start = start
+        state.support.pop(a)
+        while len(state.new_goals) > ngoals:
+            state.new_propnums.remove(state.new_goals.pop().propnum)
+        while len(state.trail) > ntrail:
+            (i, domain) = state.trail.pop()
+            state.domains[i] = domain
+        choice.marks = None
+
+    def solve_goals_ddb(self, goals):
+        '''
+        Extraction as a CSP with explanation-based learning and
+        dependency-directed backtracking, after Kambhampati
+        (extraction='ddb').  The goals of a level are variables, taken in
+        goal_order, whose values are their achievers.  Each failure comes
+        with an explanation: the positions of the goals it depends on.  An
+        achiever that is mutex with an earlier choice is explained by the
+        earliest such goal, and a failure at the level below by the goals
+        whose actions need a proposition of the nogood found there.  A
+        goal whose choice is not in the explanation is jumped over, and
+        when a whole level fails only the goals in its explanation are
+        stored in the memo, as a nogood that prunes any goal set
+        containing it.
+
+        Positions below that of the goal being assigned stand for the
+        choices made for those goals; the goal's own position and those
+        above it only for the presence of the goals.
+        '''
+        (plan, nogood) = self.ddb_level(sorted(goals), self.level + 1)
+        if plan is None:
+            return None
+        print('Solution found at level %d' % (self.level + 1))
+        self.result = plan
+        return plan
+
+    def ddb_level(self, goals, level):
+        # goals are at proposition level level.  Returns (plan, None),
+        # or (None, the propnums of a nogood among goals)
+        self.count_node()
+        if level == 0:
+            return ([], None)
+        nogood = self.unsolvable_goalsets[level].find_subset(goals)
+        if nogood is not None:
+            return (None, nogood)
+        order = self.order_goals(goals, level)
+        (plan, conflict) = self.ddb_assign(order, [None] * len(order), 0,
+                                           level)
+        if plan is not None:
+            return (plan, None)
+        nogood = [order[j] for j in sorted(conflict)]
+        self.unsolvable_goalsets[level].add(nogood)
+        return (None, frozenset(g.propnum for g in nogood))
+
+    def ddb_assign(self, order, chosen, i, level):
+        # Choose achievers for order[i:], given chosen[:i].  Returns
+        # (plan, None) or (None, the positions the failure depends on)
+        if i == len(order):
+            actions = list(dict.fromkeys(chosen))
+            subgoals = dict((p.propnum, p) for a in actions for p in a.precs)
+            (plan, nogood) = self.ddb_level(sorted(subgoals.values()),
+                                            level - 1)
+            if plan is not None:
+                return (plan + [actions], None)
+            return (None, set(j for (j, a) in enumerate(chosen)
+                              if any(p.propnum in nogood for p in a.precs)))
+        self.count_node()
+        conflict = set([i])
+        # Actions already chosen for other goals add no new subgoals.  A
+        # new list: order_achievers can return the graph's own.
+        achievers = sorted(self.order_achievers(self.achievers(order[i],
+                                                               level)),
+                           key=lambda a: a not in chosen[:i])
+        for a in achievers:
+            excludes = self.excludes_at(a, level - 1)
+            for j in range(i):
+                if (excludes >> chosen[j].index) & 1:
+                    conflict.add(j)
+                    break
+            else:
+                chosen[i] = a
+                (plan, reason) = self.ddb_assign(order, chosen, i + 1, level)
+                chosen[i] = None
+                if plan is not None:
+                    return (plan, None)
+                self.stats['backtracks'] += 1
+                if i not in reason:
+                    # This choice is not to blame: jump over it
+                    self.stats['backjumps'] += 1
+                    return (None, reason)
+                conflict |= reason
+        return (None, conflict)
+
+    def solve_sat(self, goals):
+        '''
+        Blackbox-style extraction (extraction='sat'): encode the part of
+        the graph that the goals can reach backwards as CNF, with one
+        variable per proposition and per action at each level, and solve
+        it with solve_cnf.  The clauses say that the goals hold, that a
+        proposition above level 0 needs one of its achievers, that an
+        action needs its preconditions, and that mutex actions or
+        propositions are not both chosen.  Propositions at level 0 are
+        the initial state, so they need no variables.  The plan is read
+        back from the top down, one true achiever per needed proposition,
+        preferring noops.  Each decision of the solver counts as a search
+        node against the budget; pycosat runs to the end, so the budget is
+        only checked before and after it.
+        '''
+        top = self.level + 1
+        variables = dict()
+        def var(kind, level, node):
+            key = (kind, level, node.index)
+            if key not in variables:
+                variables[key] = len(variables) + 1
+            return variables[key]
+
+        # The propositions and actions relevant to the goals, by level
+        props = [dict() for level in range(top + 1)]
+        actions = [dict() for level in range(top)]
+        props[top] = dict((g.index, g) for g in goals)
+        for level in range(top, 0, -1):
+            for pnode in props[level].values():
+                for a in self.achievers(pnode, level):
+                    actions[level-1][a.index] = a
+            for a in actions[level-1].values():
+                for pnode in a.precs:
+                    props[level-1][pnode.index] = pnode
+
+        clauses = [[var('p', top, g)] for g in goals]
+        for level in range(top, 0, -1):
+            for pnode in props[level].values():
+                clauses.append([-var('p', level, pnode)] +
+                               [var('a', level-1, a)
+                                for a in self.achievers(pnode, level)])
+                mask = self.excludes_at(pnode, level)
+                for i in bit_indices(mask >> pnode.index + 1):
+                    other = props[level].get(pnode.index + 1 + i, None)
+                    if other is not None:
+                        clauses.append([-var('p', level, pnode),
+                                        -var('p', level, other)])
+            for a in actions[level-1].values():
+                if level > 1:
+                    for pnode in a.precs:
+                        clauses.append([-var('a', level-1, a),
+                                        var('p', level-1, pnode)])
+                mask = self.excludes_at(a, level-1)
+                for i in bit_indices(mask >> a.index + 1):
+                    other = actions[level-1].get(a.index + 1 + i, None)
+                    if other is not None:
+                        clauses.append([-var('a', level-1, a),
+                                        -var('a', level-1, other)])
+
+        self.check_budget()
+        model = solve_cnf(len(variables), clauses, self.count_node)
+        self.check_budget()
+        if model is None:
+            return None
+        result = [[] for level in range(top)]
+        needed = goals
+        for level in range(top, 0, -1):
+            chosen = dict()
+            for pnode in needed:
+                achievers = [a for a in self.achievers(pnode, level)
+                             if model[var('a', level-1, a)]]
+                if not any(a.index in chosen for a in achievers):
+                    achievers.sort(key=lambda a: a.name != NOOP)
+                    chosen[achievers[0].index] = achievers[0]
+            result[level-1] = [chosen[i] for i in sorted(chosen)]
+            needed = dict((p.index, p) for a in result[level-1]
+                          for p in a.precs).values()
+        print('Solution found at level %d' % top)
+        self.result = result
+        return result
+
     def safe_index(self, l, f):
         '''
         safe_index returns the index of the first x_i
@@ -608,50 +3020,35 @@ class PlanningProblem:
             if f(l[i]): return i
         return None
 
-    def mutually_exclusive(self, goals):
+    def mutually_exclusive(self, goals, level=None):
         '''
         Return True if any two goals are mutually exclusive
         '''
+        if level is None:
+            level = self.level + 1
         for i in range(len(goals)):
-            g1 = goals[i]
+            g1 = self.excludes_at(goals[i], level)
             for j in range(i+1, len(goals)):
                 g2 = goals[j]
-                if g2 in g1.excludes:
+                if (g1 >> g2.index) & 1:
                     return True
         return False
 
-    def forward_cutoff(self, goals, actions):
+    def forward_cutoff(self, goals, actions, level=None):
         '''
         Return True if some goals has been cut off by this aciton set,
         i.e. every action that could achieve it has been excluded
         '''
+        if level is None:
+            level = self.level
+        excluded = 0
+        for a in actions:
+            excluded |= self.excludes_at(a, level)
         for g in goals:
-            possible_achievers = g.adders
-            for a in actions:
-                possible_achievers = [
-                    a for a in possible_achievers
-                    if a not in a.excludes
-                ]
-                if len(possible_achievers) == 0:
-                    return True
+            if bitmask(self.achievers(g, level + 1)) & ~excluded == 0:
+                return True
         return False
 
-    def minimal_action_set(self, goals, actions):
-        '''
-        Return False if removing any one action still satisfies all the goals.
-        This can happen if actions have overlapping effects
-        '''
-        for a in actions:
-            to_be_achieved = goals
-            reduced_actions = [a2 for a2 in actions if a2 != a]
-            for a2 in reduced_actions:
-                to_be_achieved = [a3 for a3 in to_be_achieved
-                                  if a3 not in a2.adds]
-                if len(to_be_achieved) == 0:
-                    print('Non-minimal action set:', actions)
-                    return False
-        return True
-
     def terminate(self):
         if not self.leveled_off():
             return False
@@ -664,40 +3061,606 @@ class PlanningProblem:
     def display(self):
         if self.result:
             print("Plan found:")
-            for level in self.result:
-                for action in level:
+            for (level, actions) in enumerate(self.result):
+                for action in actions:
                     if action.name != NOOP:
-                        print('%3d:' % action.level, action)
+                        print('%3d:' % level, action)
         else:
             print("No plan found.")
 
     def dump(self):
         print("Dump of planning graph:")
-        for level in range(len(self.propLevels)):
+        for level in range(self.level + 2):
+            props = self.level_props(level)
             print(('*'*16) + (' Level %d ' % level) + ('*'*16))
-            print('Proposition nodes: (' + str(len(self.propLevels[level])) + ')')
-            self.propLevels[level].sort()
-            for p in self.propLevels[level]:
+            print('Proposition nodes: (' + str(len(props)) + ')')
+            # Sort copies: the level lists are ordered by node index
+            for p in sorted(props):
                 pname = p.dump_str()
                 print(' ' + pname,end='')
-                if (len(p.excludes) > 0):
-                    p.excludes.sort()
-                    print('excl (%d)'  % len(p.excludes), end='')
-                    for e in p.excludes:
+                mask = self.excludes_at(p, level)
+                if mask:
+                    excludes = sorted(props[i] for i in bit_indices(mask))
+                    print('excl (%d)'  % len(excludes), end='')
+                    for e in excludes:
                         print('%d' % (e.prop.propnum), end='')
                 print()
 
-            if level < len(self.actionLevels):
-                print('Action nodes: (%d)' % len(self.actionLevels[level]))
-                for a in self.actionLevels[level]:
+            if level <= self.level:
+                actions = self.level_actions(level)
+                print('Action nodes: (%d)' % len(actions))
+                for a in actions:
                     aname = a.dump_str()
                     print(' ' + aname, end='')
-                    if len(a.excludes) > 0:
-                        a.excludes.sort()
-                        print('excl (%d):' % len(a.excludes), end='')
-                        for e in a.excludes:
+                    mask = self.excludes_at(a, level)
+                    if mask:
+                        excludes = sorted(actions[i] for i in bit_indices(mask))
+                        print('excl (%d):' % len(excludes), end='')
+                        for e in excludes:
                             print('%d' % e.number, end='')
                     print()
             print()
 
         return None
+
+
+class EdgeArrays:
+    '''
+    Edges from integer node IDs to integer node IDs in compressed sparse
+    row form: the targets of source i are targets[start[i]:start[i+1]].
+    Sources are appended in ID order.
+    '''
+
+    def __init__(self):
+        self.start = array('i', [0])
+        self.targets = array('i')
+
+    def __len__(self):
+        return len(self.start) - 1
+
+    def __getitem__(self, i):
+        return self.targets[self.start[i]:self.start[i+1]]
+
+    def append(self, targets):
+        self.targets.extend(targets)
+        self.start.append(len(self.targets))
+
+    def transpose(self, ntargets):
+        # The reverse edges, each source's list sorted by ID
+        counts = array('i', [0]) * (ntargets + 1)
+        for t in self.targets:
+            counts[t+1] += 1
+        for t in range(ntargets):
+            counts[t+1] += counts[t]
+        reverse = EdgeArrays()
+        reverse.start = counts
+        reverse.targets = array('i', [0]) * len(self.targets)
+        fill = array('i', counts[:-1])
+        for s in range(len(self)):
+            for k in range(self.start[s], self.start[s+1]):
+                t = self.targets[k]
+                reverse.targets[fill[t]] = s
+                fill[t] += 1
+        return reverse
+
+class PropView(PropNode):
+    '''
+    A PropNode backed by the arrays of a CompactPlanningProblem.  Views
+    are only created for extraction, display and results.  Fixed fields
+    are copied in; edges and mutexes are read from the arrays.
+    '''
+
+    def __init__(self, graph, index):
+        self.graph = graph
+        self.index = index
+        self.prop = graph.prop_props[index]
+        self.propnum = self.prop.propnum
+        self.level = graph.prop_level[index]
+
+    @property
+    def adders(self):
+        return self.graph.action_views(self.graph.prop_adders[self.index])
+
+    @property
+    def deleters(self):
+        return self.graph.action_views(self.graph.prop_deleters[self.index])
+
+    @property
+    def users(self):
+        return self.graph.action_views(self.graph.prop_users[self.index])
+
+    @property
+    def excludes(self):
+        return self.graph.prop_excludes[self.index]
+
+    @property
+    def excludes_history(self):
+        return self.graph.prop_history[self.index]
+
+class ActionView(ActionNode):
+    '''
+    An ActionNode backed by the arrays of a CompactPlanningProblem.
+    '''
+
+    def __init__(self, graph, index):
+        self.graph = graph
+        self.index = index
+        self.number = index + 1
+        self.name = graph.action_names[index]
+        self.level = graph.action_level[index]
+        self.binds = graph.action_binds[index]
+        # An action's edges never change once it is created
+        self.precs = graph.prop_views(graph.action_precs[index])
+        self.adds = graph.prop_views(graph.action_adds[index])
+        self.deletes = graph.prop_views(graph.action_deletes[index])
+        self.key = action_key(self.name, self.binds, self.precs)
+
+    @property
+    def excludes(self):
+        return self.graph.action_excludes[self.index]
+
+    @property
+    def excludes_history(self):
+        return self.graph.action_history[self.index]
+
+    @property
+    def precmask(self):
+        return self.graph.precmasks[self.index]
+
+    @property
+    def addmask(self):
+        return self.graph.addmasks[self.index]
+
+    @property
+    def delmask(self):
+        return self.graph.delmasks[self.index]
+
+class CompactPlanningProblem(PlanningProblem):
+    '''
+    A planning graph in the bi-level style of STAN and IPP.  Instead of a
+    fresh copy of every node at every level, each proposition and each
+    action exists once, and its level is the level where it first
+    appears.  Since nodes are never removed, the nodes present at a level
+    are the IDs below propCounts[level] or actionCounts[level], and a
+    node's ID is its index at every level.
+
+    The graph is stored in arrays indexed by ID: level stamps, the
+    precondition, add and delete edges of actions and the user, adder
+    and deleter edges of propositions in EdgeArrays, and bitsets for
+    masks and mutexes.  PropView and ActionView objects are created on
+    demand for extraction and results.
+
+    Mutexes only ever disappear as the graph grows, so instead of storing
+    them per level each node has a history of (level, excludes) pairs
+    recording the levels at which its excludes bitset changed.  Once the
+    graph stops changing, extra levels cost only a few counters.
+    Mutexes are always computed incrementally, as with
+    mutex_engine='incremental'.
+    '''
+
+    def __init__(self, name, instances, operators, initial, goals,
+                 grounding='product', workers=None):
+        super().__init__(name, instances, operators, initial, goals,
+                         mutex_engine='incremental', grounding=grounding,
+                         workers=workers)
+
+    def populate_prop_level_0(self):
+        # Propositions, by ID
+        self.prop_props = []     # UniqueProposition
+        self.prop_level = array('i')
+        self.prop_excludes = []
+        self.prop_history = []
+        self.prop_users = EdgeArrays()
+        self.prop_adders = EdgeArrays()
+        self.prop_deleters = EdgeArrays()
+        self.propIndex = dict()  # propnum -> ID, up to the current level
+        self.next_props = dict() # propnum -> ID, first appearing next level
+        # Actions, by ID
+        self.action_names = []
+        self.action_binds = []
+        self.action_level = array('i')
+        self.action_precs = EdgeArrays()
+        self.action_adds = EdgeArrays()
+        self.action_deletes = EdgeArrays()
+        self.precmasks = []
+        self.addmasks = []
+        self.delmasks = []
+        self.action_excludes = []
+        self.action_history = []
+        self.actionIndex = dict()  # action key -> ID
+        self.blocked_actions = []  # cached, with mutex preconditions
+        # Views, by ID, created on demand
+        self.propViews = dict()
+        self.actionViews = dict()
+
+        self.propCounts = []     # per level: number of propositions
+        self.actionCounts = []   # per level: number of actions
+        self.propExcludeCounts = [0]   # per level: number of prop mutexes
+        for prop in self.initial:
+            if prop.pred not in self.static_preds:
+                self.get_prop_id(prop, 0)
+        self.add_next_props()
+
+    def extend_graph_level(self):
+        if self.fixpoint is not None:
+            self.repeat_fixpoint()
+            return
+        self.unsolvable_goalsets.append(GoalsetMemo())
+        self.level += 1
+        print("Generating level", self.level, '-> level', self.level+1)
+
+        first = self.propCounts[-2] if self.level > 0 else 0
+        if self.facts is not None:
+            self.facts.extend(self.prop_props[first:])
+
+        self.generate_noop_actions()
+
+        if self.action_cache is not None:
+            # Actions already in the graph stay there, so the candidates
+            # are the newly ground ones and those still blocked by mutex
+            # preconditions
+            added = self.action_cache.extend(self.prop_props[first:])
+            self.generate_cached_actions(self.blocked_actions + added)
+        else:
+            if self.workers is not None:
+                self.start_workers(self.prop_props[:self.propCounts[-1]])
+            for op in self.operators:
+                self.check_budget()
+                self.generate_operator_actions(op)
+        self.check_budget()
+
+        self.actionCounts.append(len(self.action_names))
+        self.add_next_props()
+        nprops = len(self.prop_props)
+        self.prop_users = self.action_precs.transpose(nprops)
+        self.prop_adders = self.action_adds.transpose(nprops)
+        self.prop_deleters = self.action_deletes.transpose(nprops)
+        self.generate_action_excludes_links()
+        self.generate_proposition_excludes_links()
+        self.check_fixpoint()
+
+    def repeat_fixpoint(self):
+        # Nodes are stamped with the level where they first appear, so a
+        # level past the fixpoint only needs its counts
+        self.actionCounts.append(self.actionCounts[-1])
+        self.propCounts.append(self.propCounts[-1])
+        self.propExcludeCounts.append(self.propExcludeCounts[-1])
+        self.unsolvable_goalsets.append(GoalsetMemo())
+        self.level += 1
+        print("Generating level", self.level, '-> level', self.level+1,
+              '(same as level %d)' % self.fixpoint)
+
+    def generate_noop_actions(self):
+        # Only propositions that are new at this level need a noop
+        first = self.propCounts[-2] if self.level > 0 else 0
+        for p in range(first, len(self.prop_props)):
+            key = (NOOP, self.prop_props[p].propnum)
+            self.add_action(NOOP, dict(), key, [p], [p], [])
+
+    def generate_operator_actions(self, op):
+        # generate_bindprops returns IDs, since propIndex maps to IDs
+        if self.grounder is not None:
+            bindprops = self.grounder.bindprops(op)
+        else:
+            bindprops = op.generate_bindprops(self.propIndex,
+                                              self.instance_table,
+                                              self.grounding, self.facts)
+        for bp in bindprops:
+            key = action_key(op.name, bp.bindings, None)
+            if key in self.actionIndex:
+                continue
+            precmask = index_mask(bp.propnodes)
+            if any(self.prop_excludes[p] & precmask for p in bp.propnodes):
+                continue
+            (adds, deletes) = op.instantiate_effects(bp)
+            adds = [self.get_prop_id(prop, self.level+1) for prop in adds]
+            deletes = [self.get_prop_id(prop, self.level+1)
+                       for prop in deletes]
+            self.add_action(op.name, bp.bindings, key, bp.propnodes,
+                            adds, deletes)
+
+    def generate_cached_actions(self, actions):
+        self.blocked_actions = []
+        for action in actions:
+            precs = [self.propIndex[n] for n in action.precnums]
+            precmask = index_mask(precs)
+            if any(self.prop_excludes[p] & precmask for p in precs):
+                self.blocked_actions.append(action)
+                continue
+            adds = [self.get_prop_id(prop, self.level+1)
+                    for prop in action.adds]
+            deletes = [self.get_prop_id(prop, self.level+1)
+                       for prop in action.deletes]
+            self.add_action(action.op.name, action.bindings, action.key,
+                            precs, adds, deletes)
+
+    def add_action(self, name, binds, key, precs, adds, deletes):
+        ActionNode.node_counter += 1
+        self.actionIndex[key] = len(self.action_names)
+        self.action_names.append(name)
+        self.action_binds.append(binds)
+        self.action_level.append(self.level)
+        self.action_precs.append(precs)
+        self.action_adds.append(adds)
+        self.action_deletes.append(deletes)
+        self.precmasks.append(index_mask(precs))
+        self.addmasks.append(index_mask(adds))
+        self.delmasks.append(index_mask(deletes))
+        self.action_excludes.append(0)
+        self.action_history.append(None)
+
+    def get_prop_id(self, prop, level):
+        # Propositions first appearing at the next level are held in
+        # next_props until the level's actions are all generated, so
+        # that propIndex only covers the current level meanwhile.
+        p = self.propIndex.get(prop.propnum, None)
+        if p is None:
+            p = self.next_props.get(prop.propnum, None)
+        if p is None:
+            PropNode.node_counter += 1
+            p = len(self.prop_props)
+            self.prop_props.append(prop)
+            self.prop_level.append(level)
+            self.prop_excludes.append(0)
+            self.prop_history.append(None)
+            self.next_props[prop.propnum] = p
+        return p
+
+    def add_next_props(self):
+        self.propIndex.update(self.next_props)
+        self.next_props = dict()
+        self.propCounts.append(len(self.prop_props))
+
+    def get_existing_propnode(self, prop, level):
+        p = self.propIndex.get(prop.propnum, None)
+        if p is not None and self.prop_level[p] <= level:
+            return self.prop_view(p)
+        return None
+
+    def get_propnode(self, prop, level):
+        return self.prop_view(self.get_prop_id(prop, level))
+
+    def prop_view(self, p):
+        view = self.propViews.get(p, None)
+        if view is None:
+            view = self.propViews[p] = PropView(self, p)
+        return view
+
+    def action_view(self, a):
+        view = self.actionViews.get(a, None)
+        if view is None:
+            view = self.actionViews[a] = ActionView(self, a)
+        return view
+
+    def prop_views(self, ids):
+        return [self.prop_view(p) for p in ids]
+
+    def action_views(self, ids):
+        return [self.action_view(a) for a in ids]
+
+    def update_excludes(self, excludes, history, i, mask, level):
+        if history[i] is None:
+            history[i] = []
+        elif mask == excludes[i]:
+            return
+        excludes[i] = mask
+        history[i].append((level, mask))
+
+    def actions_mutex(self, a, b):
+        # Same tests as ActionNode.mutex_with, on action IDs
+        if self.delmasks[a] & (self.addmasks[b] | self.precmasks[b]):
+            return True
+        if self.delmasks[b] & (self.addmasks[a] | self.precmasks[a]):
+            return True
+        precmask = self.precmasks[b]
+        for p in self.action_precs[a]:
+            if self.prop_excludes[p] & precmask:
+                return True
+        return False
+
+    def props_mutex(self, p, q, addermasks):
+        # Same test as PropNode.excludes_prop, on proposition IDs
+        for a in self.prop_adders[p]:
+            if addermasks[q] & ~self.action_excludes[a]:
+                return False
+        return True
+
+    def generate_action_excludes_links(self):
+        nactions = len(self.action_names)
+        nold = self.actionCounts[-2] if self.level > 0 else 0
+        masks = list(self.action_excludes)
+        for a in range(nold):
+            for b in bit_indices(self.action_excludes[a]):
+                if a < b and not self.actions_mutex(a, b):
+                    masks[a] &= ~(1 << b)
+                    masks[b] &= ~(1 << a)
+        for a in range(nold, nactions):
+            for b in range(a):
+                if self.actions_mutex(a, b):
+                    masks[a] |= 1 << b
+                    masks[b] |= 1 << a
+        for a in range(nactions):
+            self.update_excludes(self.action_excludes, self.action_history,
+                                 a, masks[a], self.level)
+
+    def generate_proposition_excludes_links(self):
+        nprops = len(self.prop_props)
+        nold = self.propCounts[-2]
+        addermasks = [index_mask(self.prop_adders[p]) for p in range(nprops)]
+        masks = list(self.prop_excludes)
+        # The pairs of the level below, less those dropped, plus new ones
+        count = self.propExcludeCounts[-1]
+        for p in range(nold):
+            for q in bit_indices(self.prop_excludes[p]):
+                if p < q and not self.props_mutex(p, q, addermasks):
+                    masks[p] &= ~(1 << q)
+                    masks[q] &= ~(1 << p)
+                    count -= 1
+        for p in range(nold, nprops):
+            for q in range(p):
+                if self.props_mutex(p, q, addermasks):
+                    masks[p] |= 1 << q
+                    masks[q] |= 1 << p
+                    count += 1
+        self.propExcludeCounts.append(count)
+        for p in range(nprops):
+            self.update_excludes(self.prop_excludes, self.prop_history,
+                                 p, masks[p], self.level + 1)
+
+    def level_props(self, level):
+        return self.prop_views(range(self.propCounts[level]))
+
+    def level_actions(self, level):
+        return self.action_views(range(self.actionCounts[level]))
+
+    def first_level(self, node):
+        return node.level
+
+    def achievers(self, pnode, level):
+        # An action's ID is below actionCounts[level-1] iff it exists at
+        # action level level-1, and adder lists are sorted by ID.
+        adders = self.prop_adders
+        lo = adders.start[pnode.index]
+        hi = bisect.bisect_left(adders.targets, self.actionCounts[level-1],
+                                lo, adders.start[pnode.index+1])
+        return self.action_views(adders.targets[lo:hi])
+
+    def excludes_at(self, node, level):
+        history = node.excludes_history
+        if not history:
+            return 0
+        i = bisect.bisect_right(history, (level, float('inf'))) - 1
+        return history[i][1] if i >= 0 else 0
+
+
+### Batch solving: python -m graphplan
+
+def problem_factory(source):
+    # The problems() function of a problem module, given as a file path
+    # or a module name.  It returns fresh, unsolved PlanningProblems.
+    if source.endswith('.py') or os.sep in source:
+        name = os.path.splitext(os.path.basename(source))[0]
+        spec = importlib.util.spec_from_file_location(
+            name.replace('-', '_'), source)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(source)
+    if not hasattr(module, 'problems'):
+        raise ValueError('%s does not define problems()' % source)
+    return module.problems
+
+def solve_task(source, index, solve_options, compact):
+    # Solve problem index of source quietly and return its JSON record
+    record = dict(source=source, index=index)
+    start = time.time()
+    try:
+        with open(os.devnull, 'w') as devnull, \
+             contextlib.redirect_stdout(devnull):
+            problem = problem_factory(source)()[index]
+            if compact:
+                problem = CompactPlanningProblem(
+                    problem.name, problem.instances, problem.operators,
+                    problem.initial, problem.goals)
+            record['name'] = problem.name
+            record['build_time'] = time.time() - start
+            result = problem.solve(**solve_options)
+    except Exception as e:
+        record.update(status='error', error='%s: %s' % (type(e).__name__, e),
+                      time=time.time() - start)
+        return record
+    outcome = problem.outcome
+    record.update(status=outcome['status'], limit=outcome['limit'],
+                  levels=outcome['levels'], plan=None, steps=None)
+    if result is not None:
+        record['plan'] = [[level, str(action)]
+                          for (level, actions) in enumerate(result)
+                          for action in actions if action.name != NOOP]
+        record['steps'] = len(record['plan'])
+    record.update(nodes=problem.stats['nodes'],
+                  backtracks=problem.stats['backtracks'],
+                  prop_nodes=PropNode.node_counter,
+                  action_nodes=ActionNode.node_counter,
+                  solve_time=outcome['time'],
+                  expansion_time=outcome.get('expansion_time', None),
+                  time=time.time() - start)
+    return record
+
+def main(args=None):
+    '''
+    Solve every problem of the given problem modules in a pool of
+    processes, and print one JSON line per problem as each finishes.  A
+    problem module defines problems(), which returns fresh, unsolved
+    PlanningProblems; importing it solves nothing.  The budget options
+    apply to each problem separately.
+    '''
+    parser = argparse.ArgumentParser(
+        prog='python -m graphplan',
+        description='Solve the problems of problem modules in parallel, '
+                    'printing one JSON line per problem.')
+    parser.add_argument('sources', nargs='+', metavar='module',
+                        help='problem module file or name')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='worker processes (default: one per core)')
+    parser.add_argument('--compact', action='store_true',
+                        help='use CompactPlanningProblem')
+    parser.add_argument('--extraction', default='recursive',
+                        choices=PlanningProblem.extractions)
+    parser.add_argument('--goal-order', default='given',
+                        choices=PlanningProblem.goal_orders)
+    parser.add_argument('--achiever-order', default='given',
+                        choices=PlanningProblem.achiever_orders)
+    parser.add_argument('--max-levels', type=int)
+    parser.add_argument('--max-expansion-time', type=float, metavar='SECONDS')
+    parser.add_argument('--max-nodes', type=int)
+    parser.add_argument('--max-memory', type=int, metavar='BYTES')
+    parser.add_argument('--deadline', type=float, metavar='SECONDS')
+    options = parser.parse_args(args)
+    solve_options = dict(extraction=options.extraction,
+                         goal_order=options.goal_order,
+                         achiever_order=options.achiever_order,
+                         max_levels=options.max_levels,
+                         max_expansion_time=options.max_expansion_time,
+                         max_nodes=options.max_nodes,
+                         max_memory=options.max_memory,
+                         deadline=options.deadline)
+
+    def emit(record):
+        print(json.dumps(record), flush=True)
+
+    tasks = []
+    for source in options.sources:
+        try:
+            with open(os.devnull, 'w') as devnull, \
+                 contextlib.redirect_stdout(devnull):
+                count = len(problem_factory(source)())
+        except Exception as e:
+            emit(dict(source=source, index=None, status='error',
+                      error='%s: %s' % (type(e).__name__, e)))
+            continue
+        tasks.extend((source, index) for index in range(count))
+    # Peak memory is per process, so give each problem a fresh one
+    pool_options = dict()
+    if options.max_memory is not None:
+        pool_options['max_tasks_per_child'] = 1
+    with concurrent.futures.ProcessPoolExecutor(options.jobs,
+                                                **pool_options) as pool:
+        futures = dict((pool.submit(solve_task, source, index,
+                                    solve_options, options.compact),
+                        (source, index))
+                       for (source, index) in tasks)
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                emit(future.result())
+            except Exception as e:
+                # The worker itself died
+                (source, index) = futures[future]
+                emit(dict(source=source, index=index, status='error',
+                          error='%s: %s' % (type(e).__name__, e)))
+    return 0
+
+if __name__ == '__main__':
+    # Run through the importable module, so that problem modules doing
+    # "from graphplan import *" share its classes
+    import graphplan
+    sys.exit(graphplan.main())
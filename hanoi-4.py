@@ -1,6 +1,6 @@
 # Tower of Hanoi problem.
 
-from graphplan_y import *
+from graphplan import *
 
 # Types
 OBJECT = 'object'
@@ -39,32 +39,38 @@ o_move1 = Operator('move1',
      Proposition('on', v_disk, v_from)]
 )
 
-prob1 = PlanningProblem('hanoi',
-    # Instances
-    [i_disk_1, i_disk_2, i_disk_3, i_disk_4, i_rod_1, i_rod_2, i_rod_3],
-    # Operators
-    [o_move1],
-    # Initial state
-    [Proposition('on', i_disk_1, i_disk_2),
-     Proposition('on', i_disk_2, i_disk_3),
-     Proposition('on', i_disk_3, i_disk_4),
-     Proposition('on', i_disk_4, i_rod_1),
-
-     Proposition('clear', i_disk_1),
-
-     Proposition('clear', i_rod_2),
-     Proposition('clear', i_rod_3)],
-
-    # Goals
-    [Proposition('on', i_disk_1, i_disk_2),
-     Proposition('on', i_disk_2, i_disk_3),
-     Proposition('on', i_disk_3, i_disk_4),
-     Proposition('on', i_disk_4, i_rod_3)],
-
-)
-
-prob1.solve()
-prob1.display()
-
-print
-#prob1.dump()
+def problems():
+    # A fresh copy of each problem of this domain, unsolved
+    prob1 = PlanningProblem('hanoi',
+        # Instances
+        [i_disk_1, i_disk_2, i_disk_3, i_disk_4, i_rod_1, i_rod_2, i_rod_3],
+        # Operators
+        [o_move1],
+        # Initial state
+        [Proposition('on', i_disk_1, i_disk_2),
+         Proposition('on', i_disk_2, i_disk_3),
+         Proposition('on', i_disk_3, i_disk_4),
+         Proposition('on', i_disk_4, i_rod_1),
+
+         Proposition('clear', i_disk_1),
+
+         Proposition('clear', i_rod_2),
+         Proposition('clear', i_rod_3)],
+
+        # Goals
+        [Proposition('on', i_disk_1, i_disk_2),
+         Proposition('on', i_disk_2, i_disk_3),
+         Proposition('on', i_disk_3, i_disk_4),
+         Proposition('on', i_disk_4, i_rod_3)],
+
+    )
+    return [prob1]
+
+
+if __name__ == '__main__':
+    [prob1] = problems()
+    prob1.solve()
+    prob1.display()
+
+    print
+    #prob1.dump()
@@ -150,32 +150,38 @@ o_1m1c = Operator('move_1m1c',
      Proposition('state', v_side2, v_m2, v_c2)]
 )
 
-prob1 = PlanningProblem('mandc',
-    # Instances
-    [i_0, i_1, i_2, i_3, i_east, i_west],
-    # Operators
-    [o_1m, o_1c, o_2m, o_2c, o_1m1c],
-    # Initial state
-    [Proposition('at', i_east),
-     Proposition('other', i_west),
-     Proposition('state', i_east, i_3, i_3),
-     Proposition('state', i_west, i_0, i_0),
+def problems():
+    # A fresh copy of each problem of this domain, unsolved
+    prob1 = PlanningProblem('mandc',
+        # Instances
+        [i_0, i_1, i_2, i_3, i_east, i_west],
+        # Operators
+        [o_1m, o_1c, o_2m, o_2c, o_1m1c],
+        # Initial state
+        [Proposition('at', i_east),
+         Proposition('other', i_west),
+         Proposition('state', i_east, i_3, i_3),
+         Proposition('state', i_west, i_0, i_0),
+
+         Proposition('legal', i_3, i_3),
+         Proposition('legal', i_2, i_2),
+         Proposition('legal', i_1, i_1),
+         Proposition('legal', i_3, i_2),
+         Proposition('legal', i_3, i_1),
+         Proposition('legal', i_3, i_0),
+         Proposition('legal', i_0, i_3),
+         Proposition('legal', i_0, i_2),
+         Proposition('legal', i_0, i_1),
+         Proposition('legal', i_0, i_0)
+        ],
+        # Goals
+        [Proposition('state', i_west, i_3, i_3)]
+    )
+    return [prob1]
 
-     Proposition('legal', i_3, i_3),
-     Proposition('legal', i_2, i_2),
-     Proposition('legal', i_1, i_1),
-     Proposition('legal', i_3, i_2),
-     Proposition('legal', i_3, i_1),
-     Proposition('legal', i_3, i_0),
-     Proposition('legal', i_0, i_3),
-     Proposition('legal', i_0, i_2),
-     Proposition('legal', i_0, i_1),
-     Proposition('legal', i_0, i_0)
-    ],
-    # Goals
-    [Proposition('state', i_west, i_3, i_3)]
-)
 
-prob1.solve()
-prob1.display()
-#prob1.dump()
+if __name__ == '__main__':
+    [prob1] = problems()
+    prob1.solve()
+    prob1.display()
+    #prob1.dump()
@@ -0,0 +1,607 @@
+# Tests for graphplan.py: python -m unittest test_graphplan (or pytest).
+# They solve the bundled problem modules, check the plans found by
+# simulating them, and check that the alternative engines build the same
+# graph and find plans of the same length as the default ones.
+
+import collections
+import contextlib
+import io
+import itertools
+import json
+import os
+import random
+import unittest
+from unittest import mock
+
+import graphplan
+from graphplan import (NOOP, ActionNode, CompactPlanningProblem, EdgeArrays,
+                       GoalsetMemo, Instance, Operator, PlanningProblem,
+                       PropNode, Proposition, Variable, problem_factory)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def load(module, index=0, cls=PlanningProblem, **options):
+    # A fresh copy of problem index of a bundled problem module, as an
+    # instance of cls built with options
+    with contextlib.redirect_stdout(io.StringIO()):
+        problem = problem_factory(os.path.join(HERE, module))()[index]
+        if cls is PlanningProblem and not options:
+            return problem
+        return cls(problem.name, problem.instances, problem.operators,
+                   problem.initial, problem.goals, **options)
+
+# A small domain with a static predicate: moving along the links a-b-c
+PLACE = 'place'
+i_a = Instance('a', PLACE)
+i_b = Instance('b', PLACE)
+i_c = Instance('c', PLACE)
+v_from = Variable('from', PLACE)
+v_to = Variable('to', PLACE)
+o_move = Operator('move',
+    [Proposition('at', v_from), Proposition('link', v_from, v_to)],
+    [Proposition('at', v_to)],
+    [Proposition('at', v_from)])
+
+def travel(goals, cls=PlanningProblem, **options):
+    return cls('travel', [i_a, i_b, i_c], [o_move],
+               [Proposition('at', i_a), Proposition('link', i_a, i_b),
+                Proposition('link', i_b, i_c)],
+               goals, **options)
+
+def solve(problem, **options):
+    # problem.solve(**options) without the progress output
+    with contextlib.redirect_stdout(io.StringIO()):
+        return problem.solve(**options)
+
+def steps(plan):
+    # The number of actions in a plan, noops aside
+    return sum(len([a for a in actions if a.name != NOOP])
+               for actions in plan)
+
+def plan_names(plan):
+    return [[name(a) for a in actions] for actions in plan]
+
+def prop_mutexes(problem):
+    # Per proposition level, the set of mutex proposition pairs by name
+    return [mutex_pairs(problem, problem.level_props(level), level)
+            for level in range(problem.level + 2)]
+
+def action_mutexes(problem):
+    # Per action level, the set of mutex action pairs by name
+    return [mutex_pairs(problem, problem.level_actions(level), level)
+            for level in range(problem.level + 1)]
+
+def mutex_pairs(problem, nodes, level):
+    return set(frozenset((name(p), name(q))) for p in nodes for q in nodes
+               if (problem.excludes_at(p, level) >> q.index) & 1)
+
+def name(node):
+    # The name of a node, whatever the order of an action's bindings
+    if isinstance(node, ActionNode) and node.name != NOOP:
+        return '%s(%s)' % (node.name, ', '.join(
+            sorted('%s: %s' % binding for binding in node.binds.items())))
+    return str(node)
+
+class PlanTestCase(unittest.TestCase):
+
+    def assertValidPlan(self, problem, plan):
+        # Run the plan from the initial state: every action's
+        # preconditions hold before its step, no two actions of a step
+        # interfere, and the goals hold at the end
+        self.assertIsNotNone(plan)
+        state = set(problem.initial)
+        for (level, actions) in enumerate(plan):
+            actions = [a for a in actions if a.name != NOOP]
+            for a in actions:
+                for p in a.precs:
+                    self.assertIn(p.prop, state, 'level %d: %s' % (level, a))
+                for b in actions:
+                    deleted = set(d.prop for d in a.deletes)
+                    if b is not a:
+                        self.assertFalse(
+                            deleted & set(p.prop for p in b.precs + b.adds),
+                            'level %d: %s interferes with %s' % (level, a, b))
+            state -= set(d.prop for a in actions for d in a.deletes)
+            state |= set(p.prop for a in actions for p in a.adds)
+        for goal in problem.graph_goals:
+            self.assertIn(goal, state)
+
+class PlanTests(PlanTestCase):
+
+    # Plan lengths in levels, as found by the list-based representation
+    levels = {'cake.py': 2, 'fixit.py': 12, 'fox.py': 7, 'hanoi-3.py': 7,
+              'missionaries.py': 11}
+
+    def test_bundled_plans(self):
+        self.assertSamePlans()
+
+    def assertSamePlans(self, cls=PlanningProblem, modules=None,
+                        problem_options=None, **options):
+        # Plans found with these options are valid and as long as the
+        # default ones
+        for module in modules or self.levels:
+            problem = load(module, cls=cls, **(problem_options or {}))
+            plan = solve(problem, **options)
+            self.assertValidPlan(problem, plan)
+            self.assertEqual(len(plan), self.levels[module], module)
+
+    def test_compact_plans(self):
+        self.assertSamePlans(CompactPlanningProblem)
+
+    def test_orders(self):
+        # Each level is searched completely whatever the order, so every
+        # order finds a plan at the same level
+        for goal_order in PlanningProblem.goal_orders:
+            for achiever_order in PlanningProblem.achiever_orders:
+                self.assertSamePlans(modules=['fox.py', 'hanoi-3.py'],
+                                     goal_order=goal_order,
+                                     achiever_order=achiever_order)
+
+    def assertSameSearch(self, expected, modules=('fixit.py', 'hanoi-3.py'),
+                         **options):
+        # Searching with options finds the same plan as with expected,
+        # after the same number of search nodes, backtracks and cutoffs
+        for cls in (PlanningProblem, CompactPlanningProblem):
+            for module in modules:
+                problems = []
+                for settings in (expected, options):
+                    problem = load(module, cls=cls)
+                    plan = solve(problem, **settings)
+                    problems.append((plan_names(plan), problem.stats))
+                self.assertEqual(problems[0], problems[1])
+
+    def test_forward_checking(self):
+        # Without forward checking the same cutoff test is recomputed from
+        # scratch at each choice
+        self.assertSameSearch(dict(forward_checking=True),
+                              forward_checking=False)
+
+    def test_iterative_extraction(self):
+        self.assertSameSearch(dict(), extraction='iterative')
+        self.assertSameSearch(dict(forward_checking=False),
+                              extraction='iterative', forward_checking=False)
+
+    def test_sat_extraction(self):
+        self.assertSamePlans(extraction='sat')
+        self.assertSamePlans(CompactPlanningProblem, extraction='sat')
+
+    def test_sat_runs_no_backward_search(self):
+        # fixit levels off two levels before its plan
+        problem = load('fixit.py')
+        solve(problem, extraction='sat')
+        self.assertLess(problem.fixpoint, problem.level)
+        self.assertEqual(problem.stats['backtracks'], 0)
+
+    def test_ddb_extraction(self):
+        self.assertSamePlans(extraction='ddb')
+        self.assertSamePlans(CompactPlanningProblem, extraction='ddb')
+
+    def test_ddb_keeps_the_graph_order(self):
+        # Backjumping reorders the achievers it tries, not the graph's
+        problem = load('fixit.py')
+        solve(problem, extraction='ddb')
+        for level in range(problem.level + 2):
+            for p in problem.level_props(level):
+                self.assertEqual(p.adders, sorted(p.adders))
+
+    def test_parallel_extraction(self):
+        for cls in (PlanningProblem, CompactPlanningProblem):
+            self.assertSamePlans(cls, ['fixit.py', 'hanoi-3.py'],
+                                 extraction='parallel', extraction_workers=2)
+        # Sizing the extraction starts no grounding pool, and works with
+        # groundings that take no workers
+        for grounding in ('product', 'join'):
+            problem = load('hanoi-3.py', grounding=grounding)
+            with mock.patch.object(graphplan, 'ParallelGrounder',
+                                   side_effect=AssertionError):
+                plan = solve(problem, extraction='parallel',
+                             extraction_workers=2)
+            self.assertValidPlan(problem, plan)
+        with self.assertRaises(ValueError):
+            solve(load('fox.py'), extraction_workers=2)
+
+    def test_parallel_extraction_with_many_branches(self):
+        # Far more branches than fit in a pipe buffer
+        colours = [Instance('c%d' % i, 'colour') for i in range(5000)]
+        v_colour = Variable('colour', 'colour')
+        o_paint = Operator('paint', [Proposition('colour', v_colour)],
+                           [Proposition('painted')], [])
+        problem = PlanningProblem('paint', colours, [o_paint],
+            [Proposition('colour', c) for c in colours],
+            [Proposition('painted')])
+        plan = solve(problem, extraction='parallel', extraction_workers=2)
+        self.assertValidPlan(problem, plan)
+        self.assertEqual(len(plan), 1)
+
+    def test_parallel_worker_memo(self):
+        # A worker searches one branch of the top goal set, so failing
+        # there does not make that goal set unsolvable
+        problem = load('hanoi-3.py')
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(4):
+                problem.extend_graph_level()
+        top = problem.level + 1
+        goals = sorted(problem.get_existing_propnode(g, top)
+                       for g in problem.graph_goals)
+        for (branch, memoized) in (((0,), False), (None, True)):
+            problem.branch = branch
+            self.assertIsNone(problem.solve_goals(goals, [], goals, []))
+            self.assertEqual(
+                problem.unsolvable_goalsets[top].contains_subset(goals),
+                memoized)
+
+    def test_portfolio(self):
+        self.assertSamePlans(modules=['fixit.py', 'hanoi-3.py'],
+                             portfolio=True)
+        problem = load('fox.py')
+        solve(problem, portfolio=True)
+        stats = problem.portfolio_stats
+        self.assertEqual(len(stats), len(PlanningProblem.default_portfolio))
+        self.assertEqual(sum(s['wins'] for s in stats), 1)
+        problem = load('blocks.py', 3)
+        self.assertIsNone(solve(problem, portfolio=True))
+        self.assertEqual(problem.outcome['levels'], 3)
+
+    def test_portfolio_rejects_parallel_extraction(self):
+        # Portfolio workers cannot fork the workers of parallel extraction
+        for options in (dict(portfolio=[dict(extraction='parallel')]),
+                        dict(portfolio=True, extraction='parallel')):
+            problem = load('fox.py')
+            with self.assertRaises(ValueError):
+                solve(problem, **options)
+        problem = load('fox.py')
+        plan = solve(problem, extraction='parallel',
+                     portfolio=[dict(extraction='recursive')])
+        self.assertEqual(len(plan), self.levels['fox.py'])
+
+    def test_portfolio_budget(self):
+        # At level 11 of fixit no strategy alone searches 1000 nodes, but
+        # together they do
+        problem = load('fixit.py')
+        solve(problem, portfolio=True)
+        self.assertEqual(problem.outcome['nodes'],
+                         sum(s['nodes'] for s in problem.portfolio_stats))
+        problem = load('fixit.py')
+        self.assertIsNone(solve(problem, portfolio=True, max_nodes=1000))
+        self.assertEqual(problem.outcome['status'], 'limit')
+        self.assertEqual(problem.outcome['limit'], 'max_nodes')
+        self.assertEqual(problem.outcome['levels'], 11)
+
+    @mock.patch.object(graphplan, 'pycosat', None)
+    def test_sat_budget(self):
+        # The decisions of the built-in SAT solver are its search nodes;
+        # missionaries does not level off, so they are the only ones.
+        # pycosat runs to the end, so the test is without it.
+        problem = load('missionaries.py')
+        solve(problem, extraction='sat')
+        nodes = problem.outcome['nodes']
+        self.assertGreater(nodes, 0)
+        problem = load('missionaries.py')
+        self.assertIsNone(solve(problem, extraction='sat',
+                                max_nodes=nodes // 2))
+        self.assertEqual(problem.outcome['status'], 'limit')
+        self.assertEqual(problem.outcome['limit'], 'max_nodes')
+
+    def test_unsolvable(self):
+        # blocks.py problem 3 is unsolvable, which terminate() detects
+        # the same way from the goal sets each extraction memoizes
+        for cls in (PlanningProblem, CompactPlanningProblem):
+            for extraction in ('recursive', 'iterative', 'sat', 'ddb'):
+                problem = load('blocks.py', 3, cls=cls)
+                self.assertIsNone(solve(problem, extraction=extraction))
+                self.assertEqual(problem.outcome['status'], 'unsolvable')
+                self.assertEqual(problem.outcome['levels'], 3)
+
+class GroundingTests(unittest.TestCase):
+
+    def test_bindings_match_every_combination(self):
+        # Binding the parameters in the planned order, with each builtin or
+        # static precondition checked as soon as it is decidable, gives
+        # the combinations of instances that pass all of them
+        for module in ('blocks.py', 'fox.py', 'rocket.py'):
+            problem = load(module)
+            table = problem.instance_table
+            for op in problem.operators:
+                params = sorted(op.params, key=lambda v: v.name)
+                expected = []
+                for values in itertools.product(
+                        *[table[param.kind] for param in params]):
+                    binding = dict(zip(params, values))
+                    if all(op.evaluate(c, binding) for c in op.constraints()):
+                        expected.append(binding)
+                self.assertCountEqual(
+                    [sorted(b.items(), key=str)
+                     for b in op.generate_bindings(table)],
+                    [sorted(b.items(), key=str) for b in expected])
+
+class StaticTests(PlanTestCase):
+
+    def test_static_props_stay_out_of_the_graph(self):
+        for cls in (PlanningProblem, CompactPlanningProblem):
+            problem = travel([Proposition('at', i_c)], cls)
+            self.assertEqual(problem.static_preds, set(['link']))
+            plan = solve(problem)
+            self.assertValidPlan(problem, plan)
+            self.assertEqual(len(plan), 2)
+            for level in range(problem.level + 2):
+                self.assertEqual([p.prop.pred
+                                  for p in problem.level_props(level)
+                                  if p.prop.pred == 'link'], [])
+
+    def test_false_static_goal(self):
+        problem = travel([Proposition('at', i_b),
+                          Proposition('link', i_c, i_a)])
+        self.assertIsNone(solve(problem))
+        self.assertEqual(problem.outcome['status'], 'unsolvable')
+
+    def test_only_static_goals(self):
+        # Every goal holds statically, so the graph has no goals left and
+        # every extraction finds the empty plan
+        for cls in (PlanningProblem, CompactPlanningProblem):
+            for extraction in ('recursive', 'iterative', 'sat', 'ddb',
+                               'parallel'):
+                problem = travel([Proposition('link', i_a, i_b)], cls)
+                self.assertEqual(problem.graph_goals, [])
+                self.assertEqual(solve(problem, extraction=extraction), [[]])
+
+class GraphTests(PlanTestCase):
+
+    def test_mutex_counts_match_list_representation(self):
+        # Proposition mutex pairs per level, as counted by the list-based
+        # representation the bitsets replaced
+        expected = {'fox.py': [0, 4, 3, 10, 6, 4, 4, 4],
+                    'hanoi-3.py': [0, 6, 17, 35, 42, 41, 41, 41]}
+        for (module, counts) in expected.items():
+            problem = load(module)
+            solve(problem)
+            self.assertEqual([len(pairs) for pairs in prop_mutexes(problem)],
+                             counts)
+
+    def assertSameGraph(self, module, cls=PlanningProblem, **options):
+        # The graph built with options has the same mutexes at every level
+        # as the default one
+        expected = load(module)
+        solve(expected)
+        problem = load(module, cls=cls, **options)
+        solve(problem)
+        self.assertEqual(problem.level, expected.level)
+        for level in range(problem.level + 2):
+            self.assertEqual(
+                set(name(p) for p in problem.level_props(level)),
+                set(name(p) for p in expected.level_props(level)))
+        for level in range(problem.level + 1):
+            self.assertEqual(
+                set(name(a) for a in problem.level_actions(level)),
+                set(name(a) for a in expected.level_actions(level)))
+        self.assertEqual(prop_mutexes(problem), prop_mutexes(expected))
+        self.assertEqual(action_mutexes(problem), action_mutexes(expected))
+
+    def test_mutex_pair_counts(self):
+        # The counts the mutex engines keep for check_fixpoint are those of
+        # the pairs they mark
+        settings = [(PlanningProblem, dict()),
+                    (PlanningProblem, dict(mutex_engine='incremental')),
+                    (PlanningProblem, dict(mutex_engine='parallel')),
+                    (CompactPlanningProblem, dict())]
+        if graphplan.numpy is not None:
+            settings.append((PlanningProblem, dict(mutex_engine='numpy')))
+        for (cls, options) in settings:
+            for module in ('fixit.py', 'hanoi-3.py'):
+                problem = load(module, cls=cls, **options)
+                with mock.patch.object(PlanningProblem, 'parallel_mutex_min',
+                                       0):
+                    solve(problem)
+                self.assertEqual(problem.propExcludeCounts,
+                                 [len(pairs)
+                                  for pairs in prop_mutexes(problem)])
+
+    def test_fixpoint(self):
+        # fixit levels off two levels below its plan.  The levels past
+        # the fixpoint repeat it without building any nodes.
+        for cls in (PlanningProblem, CompactPlanningProblem):
+            problem = load('fixit.py', cls=cls)
+            with contextlib.redirect_stdout(io.StringIO()):
+                while not problem.leveled_off():
+                    problem.extend_graph_level()
+                fixpoint = problem.fixpoint
+                self.assertEqual(fixpoint, problem.level + 1)
+                counts = (PropNode.node_counter, ActionNode.node_counter)
+                for i in range(3):
+                    problem.extend_graph_level()
+            self.assertEqual((PropNode.node_counter, ActionNode.node_counter),
+                             counts)
+            self.assertEqual(problem.fixpoint, fixpoint)
+            props = [set(name(p) for p in problem.level_props(level))
+                     for level in range(problem.level + 2)]
+            mutexes = prop_mutexes(problem)
+            self.assertNotEqual((props[fixpoint - 1], mutexes[fixpoint - 1]),
+                                (props[fixpoint - 2], mutexes[fixpoint - 2]))
+            for level in range(fixpoint, problem.level + 2):
+                self.assertEqual(props[level], props[fixpoint - 1])
+                self.assertEqual(mutexes[level], mutexes[fixpoint - 1])
+            if cls is PlanningProblem:
+                self.assertIs(problem.propLevels[-1],
+                              problem.propLevels[fixpoint])
+        self.assertSameGraph('fixit.py', CompactPlanningProblem)
+
+    @unittest.skipIf(graphplan.numpy is None, 'needs NumPy')
+    def test_numpy_engine(self):
+        for module in ('fixit.py', 'hanoi-3.py'):
+            self.assertSameGraph(module, mutex_engine='numpy')
+
+    def test_incremental_engine(self):
+        for module in ('fixit.py', 'hanoi-3.py'):
+            self.assertSameGraph(module, mutex_engine='incremental')
+
+    def test_compact_graph(self):
+        for module in ('fixit.py', 'hanoi-3.py', 'fox.py'):
+            self.assertSameGraph(module, cls=CompactPlanningProblem)
+
+    def test_join_grounding(self):
+        for module in ('fixit.py', 'hanoi-3.py', 'fox.py'):
+            self.assertSameGraph(module, grounding='join')
+
+    def test_compiled_grounding(self):
+        for module in ('fixit.py', 'hanoi-3.py', 'fox.py'):
+            self.assertSameGraph(module, grounding='compiled')
+
+    def test_cached_grounding(self):
+        for cls in (PlanningProblem, CompactPlanningProblem):
+            for module in ('fixit.py', 'hanoi-3.py', 'fox.py'):
+                self.assertSameGraph(module, cls=cls, grounding='cached')
+
+    def test_parallel_grounding(self):
+        for cls in (PlanningProblem, CompactPlanningProblem):
+            for grounding in ('product', 'compiled'):
+                self.assertSameGraph('fixit.py', cls=cls, grounding=grounding,
+                                     workers=2)
+
+    def test_parallel_engine(self):
+        # With every level big enough for the pool
+        with mock.patch.object(PlanningProblem, 'parallel_mutex_min', 0):
+            self.assertSameGraph('fixit.py', mutex_engine='parallel',
+                                 workers=2)
+
+    def test_compact_edges(self):
+        # Achievers read from the compact graph's edge arrays are those of
+        # the regular graph at every level
+        expected = load('fixit.py')
+        solve(expected)
+        problem = load('fixit.py', cls=CompactPlanningProblem)
+        solve(problem)
+        for level in range(1, problem.level + 2):
+            props = dict((str(p), p) for p in problem.level_props(level))
+            for p in expected.level_props(level):
+                self.assertEqual(
+                    sorted(name(a) for a in problem.achievers(props[str(p)],
+                                                              level)),
+                    sorted(name(a) for a in expected.achievers(p, level)))
+
+    def test_edge_arrays_transpose(self):
+        edges = EdgeArrays()
+        for targets in ([2, 0], [], [1, 2], [2]):
+            edges.append(targets)
+        reverse = edges.transpose(3)
+        self.assertEqual([list(reverse[t]) for t in range(len(reverse))],
+                         [[0], [2], [0, 2, 3]])
+
+    def test_mutexes_are_symmetric(self):
+        problem = load('fixit.py')
+        solve(problem)
+        for level in range(problem.level + 1):
+            for nodes in (problem.level_props(level),
+                          problem.level_actions(level)):
+                for p in nodes:
+                    mask = problem.excludes_at(p, level)
+                    self.assertFalse((mask >> p.index) & 1)
+                    for q in nodes:
+                        self.assertEqual(
+                            (mask >> q.index) & 1,
+                            (problem.excludes_at(q, level) >> p.index) & 1)
+
+# Stands in for a PropNode where only the propnum matters
+Goal = collections.namedtuple('Goal', 'propnum')
+
+class MemoTests(unittest.TestCase):
+
+    def test_subsets_match_brute_force(self):
+        rng = random.Random(1)
+        def goalset():
+            return [Goal(n) for n in rng.sample(range(12), rng.randint(1, 6))]
+        memo = GoalsetMemo()
+        stored = []
+        for i in range(40):
+            goals = goalset()
+            memo.add(goals + goals[:1])
+            stored.append(frozenset(g.propnum for g in goals))
+        self.assertEqual(len(memo), len(set(stored)))
+        self.assertEqual(set(frozenset(keys) for keys in memo), set(stored))
+        for i in range(500):
+            goals = goalset()
+            keys = frozenset(g.propnum for g in goals)
+            found = memo.find_subset(goals)
+            if found is None:
+                self.assertFalse([s for s in stored if s <= keys])
+            else:
+                self.assertIn(found, stored)
+                self.assertLessEqual(found, keys)
+            self.assertEqual(memo.contains_subset(goals), found is not None)
+
+class CommandLineTests(unittest.TestCase):
+
+    def test_main(self):
+        # One JSON line per problem, in whatever order they finish
+        sources = [os.path.join(HERE, module)
+                   for module in ('blocks.py', 'fox.py', 'nosuch.py')]
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            status = graphplan.main(sources + ['-j', '2',
+                                               '--max-levels', '5'])
+        self.assertEqual(status, 0)
+        records = dict(((os.path.basename(r['source']), r['index']), r)
+                       for r in map(json.loads,
+                                    output.getvalue().splitlines()))
+        self.assertEqual(sorted(records),
+                         [('blocks.py', 0), ('blocks.py', 1), ('blocks.py', 2),
+                          ('blocks.py', 3), ('fox.py', 0), ('nosuch.py', None)])
+        self.assertEqual(records['nosuch.py', None]['status'], 'error')
+        for index in (0, 1):
+            record = records['blocks.py', index]
+            self.assertEqual(record['status'], 'solved')
+            self.assertEqual(record['steps'], len(record['plan']))
+        self.assertEqual(records['blocks.py', 3]['status'], 'unsolvable')
+        for key in (('blocks.py', 2), ('fox.py', 0)):
+            self.assertEqual(records[key]['status'], 'limit')
+            self.assertEqual(records[key]['limit'], 'max_levels')
+            self.assertIsNone(records[key]['plan'])
+
+    def test_solve_task(self):
+        source = os.path.join(HERE, 'fox.py')
+        for compact in (False, True):
+            record = graphplan.solve_task(source, 0, dict(), compact)
+            self.assertEqual(record['status'], 'solved')
+            self.assertEqual(record['levels'], PlanTests.levels['fox.py'])
+            self.assertEqual([level for (level, action) in record['plan']],
+                             sorted(level for (level, action)
+                                    in record['plan']))
+        record = graphplan.solve_task(source, 0, dict(extraction='none'),
+                                      False)
+        self.assertEqual(record['status'], 'error')
+        self.assertIn('ValueError', record['error'])
+
+Node = collections.namedtuple('Node', 'index')
+
+class Action:
+    # Just the adds of an action, compared by identity
+    def __init__(self, adds):
+        self.adds = adds
+
+class SupportCounterTests(unittest.TestCase):
+
+    def test_minimal_matches_brute_force(self):
+        # After any sequence of pushes and pops, minimal() agrees with
+        # trying to leave out each chosen action in turn
+        rng = random.Random(2)
+        for trial in range(200):
+            goals = [Node(i) for i in rng.sample(range(10), rng.randint(1, 6))]
+            counter = graphplan.SupportCounter(goals)
+            chosen = []
+            for step in range(30):
+                if chosen and rng.random() < 0.4:
+                    counter.pop(chosen.pop())
+                else:
+                    # Adds outside the goals, and the same add twice
+                    adds = [Node(rng.randrange(12))
+                            for i in range(rng.randint(1, 4))]
+                    chosen.append(Action(adds))
+                    counter.push(chosen[-1])
+                def covers(actions):
+                    added = set(p.index for a in actions for p in a.adds)
+                    return all(g.index in added for g in goals)
+                expected = not covers(chosen) or not any(
+                    covers(chosen[:i] + chosen[i+1:])
+                    for i in range(len(chosen)))
+                self.assertEqual(counter.minimal(), expected)
+
+if __name__ == '__main__':
+    unittest.main()